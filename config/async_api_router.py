@@ -0,0 +1,16 @@
+from django.urls import path
+
+from modules.accounts.api import async_views
+
+
+# ASGI-native versions of the auth endpoints in config.api_router. Serve
+# them with an ASGI server (uvicorn config.asgi:application); under WSGI
+# each request still occupies a worker thread.
+app_name = "async-api"
+urlpatterns = [
+    path("login/", async_views.login, name="login"),
+    path("logout/", async_views.logout, name="logout"),
+    path("auth-refresh/", async_views.refresh, name="authRefresh"),
+    path("register/", async_views.register, name="register"),
+    path("google-sign-in/", async_views.google_sign_in, name="google-sign-in"),
+]
@@ -50,6 +50,7 @@ THIRD_PARTY_APPS = [
     "crispy_bootstrap5",
     "corsheaders",
     "django_extensions",
+    "django_filters",
     "drf_spectacular",
     "rest_framework",
     "rest_framework_simplejwt",
@@ -58,12 +59,16 @@ THIRD_PARTY_APPS = [
 
 LOCAL_APPS = [
     "modules.accounts",
+    "modules.utils.tasks",
+    "modules.utils.mailer",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 AUTH_USER_MODEL = "accounts.User"
 
+AUTHENTICATION_BACKENDS = ["modules.accounts.backends.CachedPermissionBackend"]
+
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -111,6 +116,13 @@ CORS_ORIGIN_ALLOW_ALL = True
 
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+# The user, permission and response caches and the session engine share
+# state between workers through this cache, e.g. CACHE_URL=redis://redis:6379/0.
+# With the process-local default they fall back to reading the database.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -178,7 +190,7 @@ SPECTACULAR_SETTINGS = {
 # Rest Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "modules.accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "PAGE_SIZE": 24,
@@ -186,6 +198,196 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
 }
 
+# Cache of the user columns needed to authenticate API requests.
+# LOCAL_* configure the per-process LRU in front of the shared cache.
+USER_SNAPSHOT_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": env.int("USER_SNAPSHOT_CACHE_TIMEOUT", default=300),
+    "LOCAL_MAXSIZE": 1024,
+    "LOCAL_TIMEOUT": 5,
+}
+
+# Cache of each user's effective permissions, used by has_perm. Changes to
+# a group's permissions retire all entries through a generation counter in
+# CACHE_ALIAS. With a process-local cache only the LOCAL_* tier is used.
+USER_PERMISSION_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": env.int("USER_PERMISSION_CACHE_TIMEOUT", default=300),
+    "LOCAL_MAXSIZE": 1024,
+    "LOCAL_TIMEOUT": 5,
+}
+
+# Shared cache of rendered GET responses of the users API. Entries are
+# retired through a generation counter in CACHE_ALIAS; responses are not
+# cached while that cache is process-local.
+USER_RESPONSE_CACHE = {
+    "ENABLED": env.bool("USER_RESPONSE_CACHE_ENABLED", default=True),
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": env.int("USER_RESPONSE_CACHE_TIMEOUT", default=60),
+    "LOCK_TIMEOUT": 10,
+    "WAIT_TIMEOUT": 2,
+}
+
+# Users change feed at /api/users/changes/. Changes younger than SETTLE
+# seconds are held back until their transaction has committed, so SETTLE
+# must exceed the longest transaction writing users; a longer one can have
+# changes skipped. Tombstones of deleted users are kept TOMBSTONE_RETENTION
+# days, see `manage.py prune_tombstones`; cursors older than the last prune
+# must resync. Long-polls hold a worker thread for up to MAX_WAIT seconds.
+USER_CHANGES = {
+    "PAGE_SIZE": 100,
+    "MAX_PAGE_SIZE": 1000,
+    "MAX_WAIT": env.int("USER_CHANGES_MAX_WAIT", default=25),
+    "POLL_INTERVAL": 0.5,
+    "SETTLE": env.float("USER_CHANGES_SETTLE", default=2),
+    "TOMBSTONE_RETENTION": 30,
+    "PRUNE_BATCH_SIZE": 1000,
+    "PRUNE_SLEEP": 0.1,
+}
+
+# User listing of the home page. Rows are read and streamed CHUNK_SIZE at
+# a time; rendered pages are cached with the USER_RESPONSE_CACHE settings.
+HOME_PAGE = {
+    "PAGE_SIZE": 100,
+    "CHUNK_SIZE": 25,
+}
+
+# Google sign-in. MODE "userinfo" checks OAuth access tokens against
+# USERINFO_URL and caches the result for CACHE_TIMEOUT seconds; "id_token"
+# verifies ID tokens locally with the certificates from CERTS_URL and
+# requires CLIENT_IDS. The URLs can point at a local stand-in for tests.
+GOOGLE_SIGN_IN = {
+    "MODE": env("GOOGLE_SIGN_IN_MODE", default="userinfo"),
+    "CLIENT_IDS": env.list("GOOGLE_CLIENT_IDS", default=[]),
+    "USERINFO_URL": env(
+        "GOOGLE_USERINFO_URL",
+        default="https://www.googleapis.com/oauth2/v2/userinfo",
+    ),
+    "CERTS_URL": env(
+        "GOOGLE_CERTS_URL",
+        default="https://www.googleapis.com/oauth2/v3/certs",
+    ),
+    "TIMEOUT": (3.05, 5),
+    "RETRIES": 2,
+    "POOL_SIZE": 10,
+    "CACHE_ALIAS": "default",
+    "CACHE_TIMEOUT": 120,
+}
+
+# Async auth endpoints under /api/async/. Passwords are hashed in a pool of
+# HASH_WORKERS threads; beyond MAX_PENDING_HASHES queued hashes requests are
+# turned away with a 503.
+ASYNC_AUTH = {
+    "HASH_WORKERS": env.int("ASYNC_AUTH_HASH_WORKERS", default=4),
+    "MAX_PENDING_HASHES": 512,
+}
+
+# Per-worker Bloom filter of blacklisted refresh tokens. Workers sync through
+# a generation counter in CACHE_ALIAS, which must be shared between them.
+TOKEN_BLACKLIST_FILTER = {
+    "ENABLED": env.bool("TOKEN_BLACKLIST_FILTER_ENABLED", default=True),
+    "CAPACITY": 100_000,
+    "ERROR_RATE": 0.001,
+    "CACHE_ALIAS": "default",
+    "MAX_STALENESS": 30,
+}
+
+# Batched deletion of expired tokens, see `manage.py prune_tokens`.
+TOKEN_PRUNING = {
+    "BATCH_SIZE": 1000,
+    "SLEEP": 0.1,
+}
+
+# Asymmetric JWT signing keys, one `<kid>.pem` per key in KEYS_DIR, see
+# `manage.py generate_jwt_key`. Public keys are served at
+# /api/.well-known/jwks.json. While the ring is empty tokens are signed with
+# SIMPLE_JWT's HS256 key; set JWT_ACCEPT_LEGACY for one access token lifetime
+# after the switch to keep those valid, then unset it.
+JWT_KEY_RING = {
+    "KEYS_DIR": env("JWT_KEYS_DIR", default=None),
+    "ACTIVE_KID": env("JWT_ACTIVE_KID", default=None),
+    "ACCEPT_LEGACY": env.bool("JWT_ACCEPT_LEGACY", default=False),
+    "JWKS_MAX_AGE": 60 * 60 * 24,
+}
+
+# last_login is buffered per worker and written in bulk every FLUSH_INTERVAL
+# seconds, or earlier once MAX_PENDING users are waiting. The flush on exit
+# is abandoned after SHUTDOWN_TIMEOUT seconds.
+LAST_LOGIN_RECORDER = {
+    "ENABLED": env.bool("LAST_LOGIN_RECORDER_ENABLED", default=True),
+    "FLUSH_INTERVAL": 30,
+    "MAX_PENDING": 5000,
+    "SHUTDOWN_TIMEOUT": 5,
+}
+
+# Bulk user import, see `manage.py import_users` and POST /api/users/import/.
+# HASH_WORKERS > 1 hashes passwords in a process pool, outside web workers
+# only. Uploads over INLINE_MAX_BYTES are imported by a task.
+USER_IMPORT = {
+    "CHUNK_SIZE": 1000,
+    "INLINE_MAX_BYTES": 1024 * 1024,
+    "HASH_WORKERS": env.int("USER_IMPORT_HASH_WORKERS", default=4),
+}
+
+# Database-backed background tasks, see `manage.py run_worker`. Failed tasks
+# are retried after RETRY_BACKOFF * 2**(attempts - 1) seconds, at most
+# MAX_BACKOFF, and kept as failed after MAX_ATTEMPTS runs. Tasks locked for
+# longer than LOCK_TIMEOUT seconds belong to a dead worker and are retried.
+TASKS = {
+    "CONCURRENCY": env.int("TASKS_CONCURRENCY", default=4),
+    "POLL_INTERVAL": 1.0,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF": 10,
+    "MAX_BACKOFF": 3600,
+    "LOCK_TIMEOUT": 600,
+}
+
+# Outgoing mail is stored by the queued backend and sent by the task worker
+# through BACKEND, BATCH_SIZE messages at a time over connections that stay
+# open for IDLE_TIMEOUT seconds. DOMAIN_CONCURRENCY caps the threads of a
+# worker sending to one recipient domain.
+EMAIL_BACKEND = "modules.utils.mailer.backends.QueuedEmailBackend"
+MAILER = {
+    "BACKEND": env(
+        "MAILER_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+    ),
+    "BATCH_SIZE": 100,
+    "DOMAIN_CONCURRENCY": 2,
+    "MAX_ATTEMPTS": 5,
+    "IDLE_TIMEOUT": 60,
+    "MAX_MESSAGES_PER_CONNECTION": 1000,
+    "LOCK_TIMEOUT": 600,
+}
+
+# Activation links are valid for TIMEOUT seconds and only until the account
+# is active.
+ACCOUNT_ACTIVATION = {
+    "TIMEOUT": 60 * 60 * 24,
+}
+
+# Sessions are read from SESSION_CACHE_ALIAS and written to the database in
+# bulk every FLUSH_INTERVAL seconds. While that cache is process-local, e.g.
+# without CACHE_URL, they are read from and written to the database only.
+# `manage.py clearsessions` purges PURGE_BATCH_SIZE rows per transaction.
+# Deleted sessions leave a cache tombstone for TOMBSTONE_TIMEOUT seconds,
+# which must exceed the longest flush.
+SESSION_ENGINE = "modules.utils.sessions"
+SESSIONS = {
+    "WRITE_BEHIND": True,
+    "FLUSH_INTERVAL": 5,
+    "MAX_PENDING": 1000,
+    "TOMBSTONE_TIMEOUT": 300,
+    "PURGE_BATCH_SIZE": 1000,
+    "PURGE_SLEEP": 0.1,
+}
+
+# Password reset requests are queued for the task worker. Further requests
+# for the same address within THROTTLE seconds send no more email.
+PASSWORD_RESET = {
+    "CACHE_ALIAS": "default",
+    "THROTTLE": 60,
+}
+
 # JWT settings
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=30),
@@ -208,7 +410,7 @@ SIMPLE_JWT = {
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
-    "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "AUTH_TOKEN_CLASSES": ("modules.accounts.keyring.KeyRingAccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
     "JTI_CLAIM": "jti",
@@ -4,6 +4,8 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from modules.accounts.api.views import JWKSView
+
 
 urlpatterns = [
     path(settings.ADMIN_URL, admin.site.urls),
@@ -12,6 +14,8 @@ urlpatterns = [
 
 
 urlpatterns += [
+    path("api/.well-known/jwks.json", JWKSView.as_view(), name="jwks"),
+    path("api/async/", include("config.async_api_router")),
     # API base url
     path("api/", include("config.api_router")),
     path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
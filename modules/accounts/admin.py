@@ -6,12 +6,13 @@ from django.utils.translation import gettext_lazy as _
 
 from modules.accounts.forms import UserAdminChangeForm, UserAdminCreationForm
 from modules.accounts.models import SuperUser
+from modules.utils.admin import LargeTableAdminMixin
 
 User = get_user_model()
 
 
 @admin.register(User)
-class UserAdmin(auth_admin.UserAdmin):
+class UserAdmin(LargeTableAdminMixin, auth_admin.UserAdmin):
     form = UserAdminChangeForm
     add_form = UserAdminCreationForm
 
@@ -68,7 +69,8 @@ class UserAdmin(auth_admin.UserAdmin):
         "is_staff",
         "role",
     ]
-    search_fields = ["name"]
+    # icontains lookups, served by the trigram indexes on PostgreSQL
+    search_fields = ["name", "email", "phone_no"]
     ordering = ["id"]
     add_fieldsets = (
         (
@@ -81,7 +83,7 @@ class UserAdmin(auth_admin.UserAdmin):
     )
 
 
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Custom admin configuration for the Profile model.
     """
@@ -92,7 +94,10 @@ class ProfileAdmin(admin.ModelAdmin):
         "get_phone_number",
         "get_timestamp",
     ]
+    list_select_related = ["user"]
     list_filter = ["gender"]
+    # Served by the trigram indexes on accounts_user on PostgreSQL
+    search_fields = ["user__name", "user__email", "user__phone_no"]
     ordering = ["id"]
 
     def get_name(self, obj):
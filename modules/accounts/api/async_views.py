@@ -0,0 +1,271 @@
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from modules.accounts.api.serializers import RegisterSerializer, UserSerializer
+from modules.accounts.authentication import CachedJWTAuthentication
+from modules.accounts.blacklist import FilteredRefreshToken
+from modules.accounts.google import (
+    GoogleTokenError,
+    GoogleUnavailableError,
+    google_token_verifier,
+)
+from modules.accounts.hashing import acheck_password, amake_password
+from modules.accounts.last_login import last_login_recorder
+from modules.utils.executors import ExecutorBusy
+
+User = get_user_model()
+
+# Same message as TokenObtainSerializer
+NO_ACTIVE_ACCOUNT = "No active account found with the given credentials"
+
+
+def error_response(exc):
+    """
+    Render a DRF ``APIException`` the way DRF's exception handler does.
+    """
+    data = (
+        exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    )
+    return JsonResponse(data, status=exc.status_code)
+
+
+def async_post_view(view):
+    """
+    Turn ``view(request, data)`` into an ASGI-native POST endpoint.
+
+    ``data`` is the JSON or form encoded body. The view runs outside of
+    ``ATOMIC_REQUESTS``, which Django does not support for async views, and
+    is exempt from CSRF checks like the DRF views it mirrors. DRF API
+    exceptions become their usual JSON responses.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "POST":
+            return JsonResponse(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status=status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse(
+                    {"detail": "JSON parse error."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not isinstance(data, dict):
+                data = {}
+        else:
+            data = request.POST.dict()
+
+        try:
+            return await view(request, data, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return error_response(exc)
+        except ExecutorBusy:
+            return JsonResponse(
+                {"detail": "Too many concurrent requests, try again."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+    wrapper.csrf_exempt = True
+    wrapper._non_atomic_requests = {DEFAULT_DB_ALIAS}
+    return wrapper
+
+
+async def aauthenticate(request):
+    """
+    Authenticate the request's bearer token like the DRF views.
+
+    Returns:
+        User: The authenticated user.
+
+    Raises:
+        APIException: The request is not authenticated.
+    """
+    result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    if result is None:
+        raise NotAuthenticated()
+    return result[0]
+
+
+@async_post_view
+async def login(request, data):
+    """
+    Async ``POST /api/login/``.
+    """
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return JsonResponse(
+            {
+                field: ["This field is required."]
+                for field in ("email", "password")
+                if not data.get(field)
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    user = await (
+        User.objects.filter(email=email)
+        .prefetch_related("groups", "user_permissions")
+        .afirst()
+    )
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords.
+        await amake_password(password)
+        raise exceptions.AuthenticationFailed(NO_ACTIVE_ACCOUNT, "no_active_account")
+    if not await acheck_password(password, user.password) or not user.is_active:
+        raise exceptions.AuthenticationFailed(NO_ACTIVE_ACCOUNT, "no_active_account")
+
+    refresh = await FilteredRefreshToken.afor_user(user)
+    if api_settings.UPDATE_LAST_LOGIN:
+        await sync_to_async(last_login_recorder.record)(user)
+
+    return JsonResponse(
+        {
+            "user": UserSerializer(user).data,
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }
+    )
+
+
+@async_post_view
+async def refresh(request, data):
+    """
+    Async ``POST /api/auth-refresh/``.
+    """
+    if not data.get("refresh"):
+        return JsonResponse(
+            {"refresh": ["This field is required."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        token = await FilteredRefreshToken.afrom_string(data["refresh"])
+    except TokenError as e:
+        raise InvalidToken(e.args[0]) from e
+
+    response_data = {"access": str(token.access_token)}
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            await token.ablacklist()
+        token.set_jti()
+        token.set_exp()
+        token.set_iat()
+        response_data["refresh"] = str(token)
+    return JsonResponse(response_data)
+
+
+@async_post_view
+async def logout(request, data):
+    """
+    Async ``POST /api/logout/``.
+    """
+    await aauthenticate(request)
+
+    refresh_token = data.get("refresh_token")
+    if not refresh_token:
+        return JsonResponse(
+            {"error": "Refresh token is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        token = await FilteredRefreshToken.afrom_string(refresh_token)
+        await token.ablacklist()
+    except TokenError as e:
+        return JsonResponse(
+            {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return JsonResponse({"success": "User was successfully logged out."})
+
+
+def save_registered_user(serializer, user):
+    # Async views run outside ATOMIC_REQUESTS, so the insert gets its own
+    # transaction (or savepoint) to roll back on a duplicate.
+    with transaction.atomic():
+        return serializer.save_user(user)
+
+
+@async_post_view
+async def register(request, data):
+    """
+    Async ``POST /api/register/``.
+    """
+    serializer = RegisterSerializer(data=data)
+    # Field validation only, the serializer runs no queries.
+    serializer.is_valid(raise_exception=True)
+
+    user = serializer.build_user(serializer.validated_data)
+    user.password = await amake_password(serializer.validated_data["password"])
+    serializer.instance = await sync_to_async(save_registered_user)(serializer, user)
+    refresh = await FilteredRefreshToken.afor_user(user)
+
+    return JsonResponse(
+        {
+            "user": serializer.data,
+            "access_token": str(refresh.access_token),
+            "refresh_token": str(refresh),
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@async_post_view
+async def google_sign_in(request, data):
+    """
+    Async ``POST /api/google-sign-in/``.
+    """
+    token = data.get("token")
+    if not token:
+        return JsonResponse(
+            {"error": "Token is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        response_data = await google_token_verifier.averify(token)
+    except GoogleTokenError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except GoogleUnavailableError as e:
+        return JsonResponse(
+            {"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    email = response_data.get("email")
+    if not email:
+        return JsonResponse(
+            {"error": "Email not provided by Google"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        validate_email(email)
+    except ValidationError:
+        return JsonResponse(
+            {"error": "Invalid email address"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    user, created = await User.objects.aget_or_create(email=email)
+    if created:
+        user.name = response_data.get("name", "")
+        user.is_active = True
+        user.set_unusable_password()
+        await user.asave()
+
+    token = await FilteredRefreshToken.afor_user(user)
+    return JsonResponse({"refresh": str(token), "access": str(token.access_token)})
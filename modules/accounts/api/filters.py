@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+User = get_user_model()
+
+
+class UserFilter(filters.FilterSet):
+    """
+    Filters for the users list. ``created`` and ``updated`` take
+    ``_after`` / ``_before`` ISO 8601 bounds and run on indexed columns.
+    """
+
+    created = filters.IsoDateTimeFromToRangeFilter(field_name="created_at")
+    updated = filters.IsoDateTimeFromToRangeFilter(field_name="updated_at")
+
+    class Meta:
+        model = User
+        fields = ["role", "is_active", "is_staff"]
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    ``icontains`` search that only accepts terms a trigram index can serve.
+
+    Terms shorter than three characters contain no trigram, so PostgreSQL
+    would have to scan the whole index; they are rejected instead.
+    """
+
+    min_term_length = 3
+
+    def get_search_terms(self, request):
+        terms = super().get_search_terms(request)
+        if any(len(term) < self.min_term_length for term in terms):
+            raise ValidationError(
+                {
+                    "error": f"Search terms need at least "
+                    f"{self.min_term_length} characters."
+                }
+            )
+        return terms
@@ -0,0 +1,395 @@
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+
+def normalized_query(request):
+    """
+    Returns:
+        str: The request's query string with its parameters sorted.
+    """
+    return urlencode(sorted(request.query_params.lists()), doseq=True)
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Model serializer mixin that keeps only the requested fields and narrows
+    a queryset to the columns and relations those fields read.
+
+    Args:
+        fields (iterable, optional): Names of the fields to keep.
+        exclude (iterable, optional): Names of the fields to drop.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+    def optimize_queryset(self, queryset, extra_fields=()):
+        """
+        Load only what the remaining fields need: their own columns through
+        ``only()``, foreign keys through ``select_related`` and many-to-many
+        fields through one prefetch each.
+
+        Args:
+            queryset (QuerySet): Queryset of the serializer's model.
+            extra_fields (iterable): More columns to load, e.g. ordering keys.
+
+        Returns:
+            QuerySet: The narrowed queryset.
+        """
+        opts = self.Meta.model._meta
+        columns = {opts.pk.name, *extra_fields}
+        related = []
+        prefetches = []
+
+        for field in self.fields.values():
+            if field.source == "*" or isinstance(
+                field, serializers.SerializerMethodField
+            ):
+                # Reads arbitrary attributes, so every column has to be there.
+                columns = None
+                continue
+            try:
+                model_field = opts.get_field(field.source.split(".")[0])
+            except FieldDoesNotExist:
+                columns = None
+                continue
+
+            if model_field.many_to_many or model_field.one_to_many:
+                lookup = (
+                    model_field.name
+                    if model_field.concrete
+                    else model_field.get_accessor_name()
+                )
+                if isinstance(field, ManyRelatedField) and isinstance(
+                    field.child_relation, PrimaryKeyRelatedField
+                ):
+                    related_model = model_field.related_model
+                    prefetches.append(
+                        Prefetch(
+                            lookup,
+                            queryset=related_model._default_manager.only("pk"),
+                        )
+                    )
+                else:
+                    prefetches.append(lookup)
+            elif model_field.is_relation:
+                if "." in field.source:
+                    related.append(model_field.name)
+                    columns = None
+                elif columns is not None:
+                    columns.add(model_field.name)
+            elif columns is not None:
+                columns.add(model_field.name)
+
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    Support ``?fields=a,b`` and ``?exclude=c`` on read requests of a view
+    whose serializer uses ``SparseFieldsetSerializerMixin``, and fetch only
+    what the chosen fields need.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def get_sparse_fieldset(self):
+        """
+        Returns:
+            dict: ``fields`` and ``exclude`` from the query string, empty for
+            write requests.
+
+        Raises:
+            ValidationError: A name is unknown or both requested and
+            excluded, or no field is left.
+        """
+        if getattr(self, "swagger_fake_view", False) or self.request is None:
+            return {}
+        if self.request.method not in SAFE_METHODS:
+            return {}
+        if hasattr(self, "_sparse_fieldset"):
+            return self._sparse_fieldset
+
+        fieldset = {}
+        available = set(self.get_serializer_class()().fields)
+        for key, param in (
+            ("fields", self.fields_query_param),
+            ("exclude", self.exclude_query_param),
+        ):
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            names = [name.strip() for name in value.split(",") if name.strip()]
+            unknown = sorted(set(names) - available)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"error": f"Unknown {param}: {', '.join(unknown)}."}
+                )
+            fieldset[key] = names
+
+        both = sorted(
+            set(fieldset.get("fields", ())) & set(fieldset.get("exclude", ()))
+        )
+        if both:
+            raise serializers.ValidationError(
+                {"error": f"Both requested and excluded: {', '.join(both)}."}
+            )
+        remaining = set(fieldset.get("fields", available))
+        if not remaining - set(fieldset.get("exclude", ())):
+            raise serializers.ValidationError({"error": "No fields left to return."})
+        self._sparse_fieldset = fieldset
+        return fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        for key, names in self.get_sparse_fieldset().items():
+            kwargs.setdefault(key, names)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return queryset
+        # Keyset pagination reads the ordering keys of each page's edges.
+        extra_fields = [
+            name
+            for name in getattr(self, "ordering_fields", None) or ()
+            if name != "__all__"
+        ]
+        return self.get_serializer().optimize_queryset(queryset, extra_fields)
+
+
+class NonAtomicActionsViewMixin:
+    """
+    Let viewset actions opt out of ``ATOMIC_REQUESTS`` with
+    ``transaction.non_atomic_requests``.
+
+    Django reads the marker from the view function of the route, which a
+    router builds from the whole viewset, so the marker of the actions the
+    route maps to is copied onto it.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        markers = [
+            getattr(getattr(cls, name), "_non_atomic_requests", set())
+            for name in (actions or {}).values()
+        ]
+        if markers and all(markers):
+            view._non_atomic_requests = set.intersection(*markers)
+        return view
+
+
+class ConditionalGetViewMixin:
+    """
+    Answer ``list`` and ``retrieve`` requests with ``304 Not Modified``,
+    before anything is serialized, while the client's ``If-None-Match`` or
+    ``If-Modified-Since`` still holds.
+
+    The validators come from ``last_modified_field``: the row's own value
+    for a detail request. A paginated list only reads the ids and
+    ``last_modified_field`` of the requested page, one query bounded by the
+    page size, and its ETag covers those ids, their maximum of
+    ``last_modified_field`` and whether more pages exist, so updates,
+    inserts and deletes that show on the page all change it. Unpaginated
+    lists use the maximum and the row count of the whole queryset. The
+    ETag also covers the query string and the renderer, which both change
+    the body.
+    """
+
+    last_modified_field = "updated_at"
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = None
+        if self.pagination_class is not None:
+            validators = self.get_page_validators(queryset)
+        if validators is None:
+            aggregate = queryset.order_by().aggregate(
+                count=Count("pk"),
+                last_modified=Max(self.last_modified_field),
+            )
+            validators = f"list:{aggregate['count']}", aggregate["last_modified"]
+        key, last_modified = validators
+        # If-Modified-Since alone cannot see deletions, so lists are only
+        # matched on the ETag.
+        return self.conditional_response(
+            request,
+            key,
+            last_modified,
+            partial(super().list, request, *args, **kwargs),
+            match_last_modified=False,
+        )
+
+    def get_page_validators(self, queryset):
+        """
+        Read the page of ``queryset`` the request asks for, as ids and
+        ``last_modified_field`` only.
+
+        Args:
+            queryset (QuerySet): The filtered queryset.
+
+        Returns:
+            tuple: The key identifying the page's version and when its most
+            recently modified row changed, or None if the request is not
+            paginated.
+        """
+        paginator = self.pagination_class()
+        ordering = paginator.get_ordering(self.request, queryset, self)
+        columns = {"pk", self.last_modified_field}
+        columns.update(field.lstrip("-") for field in ordering)
+        rows = paginator.paginate_queryset(
+            queryset.prefetch_related(None).values(*columns), self.request, self
+        )
+        if rows is None:
+            return None
+        last_modified = max(
+            (
+                row[self.last_modified_field]
+                for row in rows
+                if row[self.last_modified_field]
+            ),
+            default=None,
+        )
+        pks = ",".join(str(row["pk"]) for row in rows)
+        flags = [
+            getattr(paginator, name, None)
+            for name in ("has_previous", "has_next", "count")
+        ]
+        return f"list:{flags}:{pks}", last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        # As get_object_or_404, plus OverflowError: SQLite cannot bind ids
+        # beyond 64 bits.
+        try:
+            row = (
+                self.filter_queryset(self.get_queryset())
+                .order_by()
+                .prefetch_related(None)
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list("pk", self.last_modified_field)
+                .first()
+            )
+        except (TypeError, ValueError, OverflowError, ValidationError):
+            raise Http404
+        handler = partial(super().retrieve, request, *args, **kwargs)
+        if row is None:
+            return handler()
+        return self.conditional_response(request, f"detail:{row[0]}", row[1], handler)
+
+    def conditional_response(
+        self, request, key, last_modified, handler, match_last_modified=True
+    ):
+        """
+        Return 304 if the request's validators match, else the handler's
+        response, with ``ETag`` and ``Last-Modified`` set on either.
+
+        Args:
+            request (Request): The current request.
+            key (str): Identifies the resource version, e.g. its primary key.
+            last_modified (datetime): When the resource last changed.
+            handler (callable): Builds the full response.
+            match_last_modified (bool): Honour ``If-Modified-Since``.
+
+        Returns:
+            HttpResponse: The 304 or the full response.
+        """
+        version = (
+            f"{key}:{last_modified and last_modified.isoformat()}:"
+            f"{request.accepted_renderer.format}?{normalized_query(request)}"
+        )
+        etag = quote_etag(hashlib.blake2b(version.encode(), digest_size=16).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp if match_last_modified else None,
+        )
+        if response is None:
+            response = handler()
+            if response.status_code != 200:
+                return response
+
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+
+class ResponseCacheViewMixin:
+    """
+    Serve ``list`` and ``retrieve`` from ``response_cache`` (a
+    ``ResponseCache``), keyed by the path, the sorted query string, the
+    renderer and the caller's permission scope. Hits skip the database and
+    serialization, and a matching ``If-None-Match`` gets a 304.
+    """
+
+    response_cache = None
+
+    def get_response_cache_scope(self):
+        """
+        Returns:
+            str: Identifies the users that are shown the same responses.
+        """
+        user = self.request.user
+        return f"{user.role}:{user.is_staff:d}:{user.is_superuser:d}"
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().retrieve, request, *args, **kwargs)
+        )
+
+    def cached_response(self, request, handler):
+        cache = self.response_cache
+        if cache is None or not cache.active:
+            return handler()
+
+        key = cache.make_key(
+            self.get_response_cache_scope(),
+            request.accepted_renderer.format,
+            request.path,
+            normalized_query(request),
+        )
+
+        def render():
+            response = self.finalize_response(
+                request, handler(), *self.args, **self.kwargs
+            )
+            return response.render() if hasattr(response, "render") else response
+
+        response, cached = cache.get_or_render(key, render)
+        if cached and response.has_header("ETag"):
+            not_modified = get_conditional_response(request, etag=response["ETag"])
+            if not_modified is not None:
+                not_modified["ETag"] = response["ETag"]
+                return not_modified
+        return response
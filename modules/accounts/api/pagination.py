@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+
+from modules.utils.queries import estimate_count
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination with opaque cursors.
+
+    Every page is a ``WHERE key < last_seen ORDER BY key LIMIT n`` on the
+    view's ordering, so deep pages cost the same as the first and no
+    ``COUNT(*)`` is run. Pass ``?count=estimate`` to add the planner's
+    estimate of the total as ``count``.
+    """
+
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "estimate":
+            self.count = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = OrderedDict(
+                [("count", self.count), *response.data.items()],
+            )
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "count": {"type": "integer", "nullable": True},
+            **response_schema["properties"],
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `estimate` to include an estimated total.",
+                "schema": {"type": "string", "enum": ["estimate"]},
+            }
+        ]
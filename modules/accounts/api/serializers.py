@@ -1,16 +1,25 @@
+import re
+
 from django.contrib.auth import get_user_model
 from modules.accounts.models import RoleChoices
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenObtainSerializer,
+    TokenRefreshSerializer,
+)
 from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.models import update_last_login
-from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from modules.accounts.api.mixins import SparseFieldsetSerializerMixin
+from modules.accounts.blacklist import FilteredRefreshToken
+from modules.accounts.last_login import last_login_recorder
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for the User model.
 
@@ -58,6 +67,8 @@ class LoginSerializer(TokenObtainPairSerializer):
         A dictionary containing user data, refresh token, and access token.
     """
 
+    token_class = FilteredRefreshToken
+
     def validate(self, attrs):
         """
         Validate user credentials and generate JWT tokens.
@@ -68,20 +79,32 @@ class LoginSerializer(TokenObtainPairSerializer):
         Returns:
             dict: A dictionary containing user data, refresh token, and access token.
         """
-        data = super().validate(attrs)
+        # Skip TokenObtainPairSerializer.validate, which would issue a second
+        # refresh token and write last_login synchronously.
+        data = TokenObtainSerializer.validate(self, attrs)
         refresh = self.get_token(self.user)
         data["user"] = UserSerializer(self.user).data
         data["refresh"] = str(refresh)
         data["access"] = str(refresh.access_token)
 
         if api_settings.UPDATE_LAST_LOGIN:
-            # Update user's last login timestamp
-            self.user.last_login = timezone.now()
-            self.user.save()
+            # Buffered, written in bulk by the last_login recorder
+            last_login_recorder.record(self.user)
 
         return data
 
 
+class RefreshSerializer(TokenRefreshSerializer):
+    """
+    Serializer for refresh token rotation.
+
+    Checks the refresh token against the in-memory blacklist filter so
+    tokens that were never blacklisted skip the blacklist tables.
+    """
+
+    token_class = FilteredRefreshToken
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration.
@@ -137,35 +160,119 @@ class RegisterSerializer(serializers.ModelSerializer):
                 {"error": "Passwords do not match."},
             )
 
-        # Check if a user with the same email already exists
-        if User.objects.filter(email=data.get("email")).exists():
-            raise serializers.ValidationError(
-                {
-                    "error": "User with this email already exists.",
-                },
-            )
-
         return data
 
     def create(self, validated_data):
-        phone_no = validated_data.get("phone_no")
-        email = validated_data.get("email")
-        name = validated_data.get("name")
-        password = validated_data.get("password")
-
-        # Check if a user with the same phone number already exists
-        if User.objects.filter(phone_no=phone_no).exists():
-            raise serializers.ValidationError(
-                {"error": "User with this phone number already exists."},
-            )
+        user = self.build_user(validated_data)
+        user.set_password(validated_data.get("password"))
+        return self.save_user(user)
 
-        user = User(
-            phone_no=phone_no,
-            email=email,
-            name=name,
+    def build_user(self, validated_data):
+        """
+        Returns:
+            User: The unsaved user, without a password.
+        """
+        return User(
+            phone_no=validated_data.get("phone_no"),
+            email=validated_data.get("email"),
+            name=validated_data.get("name"),
             role=RoleChoices.SUPERUSER,
             is_active=True,
         )
-        user.set_password(password)
-        user.save()
+
+    def save_user(self, user):
+        """
+        Insert ``user`` and its profile.
+
+        Raises:
+            ValidationError: The email or phone number is taken.
+        """
+        # Duplicate emails and phone numbers are rejected by the unique
+        # constraints instead of pre-check queries. Without a savepoint, a
+        # failure marks the surrounding request transaction for rollback.
+        try:
+            with transaction.atomic(savepoint=False):
+                user.save()
+        except IntegrityError as e:
+            raise serializers.ValidationError(self.get_integrity_error_detail(e)) from e
         return user
+
+    def get_integrity_error_detail(self, error):
+        """
+        Map a unique constraint violation to the error payload the former
+        pre-check queries returned.
+
+        Args:
+            error (IntegrityError): The error raised by the insert.
+
+        Returns:
+            dict: The error detail returned to the client.
+        """
+        field = self.get_violated_field(error)
+        if field == "phone_no":
+            return {"error": "User with this phone number already exists."}
+        if field == "email":
+            # Raised from validate() before, hence the list
+            return {"error": ["User with this email already exists."]}
+        raise error
+
+    def get_violated_field(self, error):
+        """
+        Name the user field whose unique constraint ``error`` violated.
+
+        PostgreSQL reports the constraint name; other backends only name the
+        column in the message, e.g. ``UNIQUE constraint failed:
+        accounts_user.email`` on SQLite. The submitted values never take
+        part in the match.
+
+        Args:
+            error (IntegrityError): The error raised by the insert.
+
+        Returns:
+            str | None: The field name, or None for any other violation.
+        """
+        table = User._meta.db_table
+        diag = getattr(error.__cause__, "diag", None)
+        constraint = getattr(diag, "constraint_name", None)
+        if constraint:
+            for model_constraint in User._meta.constraints:
+                if model_constraint.name == constraint:
+                    return model_constraint.fields[0]
+            # unique=True columns get the backend's default name, e.g.
+            # accounts_user_email_key, or a hashed suffix if altered later
+            if constraint.startswith(f"{table}_email_"):
+                return "email"
+            return None
+        columns = re.findall(rf"\b{table}\.(\w+)", str(error))
+        if columns and columns[-1] in ("phone_no", "email"):
+            return columns[-1]
+        return None
+
+
+class UserImportSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk user import.
+
+    Uniqueness of email and phone number is checked per chunk by the
+    importer, not per row.
+    """
+
+    email = serializers.EmailField(max_length=254)
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    phone_no = serializers.CharField(
+        max_length=56,
+        required=False,
+        allow_blank=True,
+        allow_null=True,
+    )
+    password = serializers.CharField(
+        max_length=128,
+        required=False,
+        allow_blank=True,
+        write_only=True,
+    )
+    role = serializers.ChoiceField(
+        choices=RoleChoices.choices,
+        default=RoleChoices.SUPERUSER,
+    )
+    is_active = serializers.BooleanField(default=True)
@@ -1,19 +1,62 @@
-import requests
+import csv
+import io
+import json
+import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from modules.accounts.permissions import IsSuperUser
+from modules.accounts.permissions import CanExportUsers, CanImportUsers, IsSuperUser
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+
+from modules.accounts.blacklist import FilteredRefreshToken
+from modules.accounts.changes import CursorExpired, InvalidCursor, user_change_feed
+from modules.accounts.google import (
+    GoogleTokenError,
+    GoogleUnavailableError,
+    google_token_verifier,
+)
+from modules.accounts.importing import (
+    CSV_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    UserImporter,
+    decode_lines,
+    read_csv,
+    read_ndjson,
+)
+from modules.accounts.keyring import key_ring_backend
+from modules.accounts.response_cache import user_response_cache
+from modules.accounts.tasks import import_users_file
 
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.core.exceptions import ValidationError
+from modules.accounts.api.filters import TrigramSearchFilter, UserFilter
+from modules.accounts.api.mixins import (
+    ConditionalGetViewMixin,
+    NonAtomicActionsViewMixin,
+    ResponseCacheViewMixin,
+    SparseFieldsetViewMixin,
+)
+from modules.accounts.api.pagination import KeysetPagination
 from modules.accounts.api.serializers import (
     LoginSerializer,
+    RefreshSerializer,
     RegisterSerializer,
     UserSerializer,
 )
@@ -67,7 +110,7 @@ class LogoutViewSet(ModelViewSet):
 
         try:
             # Blacklist the refresh token, making it invalid
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                 {"success": "User was successfully logged out."},
@@ -85,6 +128,7 @@ class RefreshViewSet(ModelViewSet, TokenRefreshView):
     by passing the refresh token in order to get a new access token
     """
 
+    serializer_class = RefreshSerializer
     permission_classes = (AllowAny,)
     http_method_names = ["post"]
 
@@ -118,7 +162,7 @@ class RegisterViewSet(ModelViewSet):
 
         try:
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = FilteredRefreshToken.for_user(user)
 
             response_data = {
                 "user": serializer.data,
@@ -142,7 +186,8 @@ class GoogleSocialLoginViewSet(ModelViewSet):
     Google Social Login, Use the url below to test the endpoint;
     https://www.googleapis.com/auth/userinfo.email
     https://developers.google.com/oauthplayground/
-    return access_token from the url above
+    return access_token from the url above, or an ID token when
+    ``GOOGLE_SIGN_IN["MODE"]`` is ``id_token``
     """
 
     permission_classes = [AllowAny]
@@ -158,12 +203,7 @@ class GoogleSocialLoginViewSet(ModelViewSet):
             )
 
         try:
-            response = requests.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                params={"access_token": token},
-            )
-            response.raise_for_status()
-            response_data = response.json()
+            response_data = google_token_verifier.verify(token)
 
             email = response_data.get("email")
             if not email:
@@ -183,12 +223,12 @@ class GoogleSocialLoginViewSet(ModelViewSet):
 
             user, created = User.objects.get_or_create(email=email)
             if created:
-                user.full_name = response_data.get("name", "")
+                user.name = response_data.get("name", "")
                 user.is_active = True
                 user.set_unusable_password()
                 user.save()
 
-            token = RefreshToken.for_user(user)
+            token = FilteredRefreshToken.for_user(user)
             return Response(
                 {
                     "refresh": str(token),
@@ -196,19 +236,307 @@ class GoogleSocialLoginViewSet(ModelViewSet):
                 },
                 status=status.HTTP_200_OK,
             )
-        except requests.HTTPError as e:
+        except GoogleTokenError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except GoogleUnavailableError as e:
             return Response(
-                {"error": f"Google API request failed: {e.response.text}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
 
-class UserViewSet(ModelViewSet):
+_sparse_fieldset_parameters = [
+    OpenApiParameter("fields", description="Comma separated fields to return."),
+    OpenApiParameter("exclude", description="Comma separated fields to omit."),
+]
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=_sparse_fieldset_parameters),
+    retrieve=extend_schema(parameters=_sparse_fieldset_parameters),
+)
+class UserViewSet(
+    NonAtomicActionsViewMixin,
+    ResponseCacheViewMixin,
+    ConditionalGetViewMixin,
+    SparseFieldsetViewMixin,
+    ModelViewSet,
+):
     """
     API endpoint that allows users to be viewed, created, updated, or deleted.
+
+    Read requests accept ``?fields=`` or ``?exclude=`` with comma separated
+    field names; only the columns and relations of the returned fields are
+    queried. ``list`` and ``retrieve`` support conditional requests and are
+    served from the shared response cache.
     """
 
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsSuperUser]
     http_method_names = ["get", "post", "put", "patch", "delete"]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, OrderingFilter]
+    filterset_class = UserFilter
+    # Backed by the trigram indexes of migration 0005 on PostgreSQL
+    search_fields = ["name", "email", "phone_no"]
+    # Unique, indexed keys only, so every page is an index range scan
+    ordering_fields = ["id", "email"]
+    ordering = ["-id"]
+    response_cache = user_response_cache
+
+    export_chunk_size = 2000
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "export_format",
+                enum=["ndjson", "csv"],
+                default="ndjson",
+            ),
+        ],
+        responses={
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+            (200, "text/csv"): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated, CanExportUsers],
+    )
+    def export(self, request, *args, **kwargs):
+        """
+        Stream every user as NDJSON or CSV. Needs staff status or
+        ``accounts.view_user``.
+
+        Rows are read through a server-side cursor in chunks, each chunk with
+        one batched prefetch of group and permission ids, so memory use does
+        not grow with the table.
+        """
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in ("ndjson", "csv"):
+            return Response(
+                {"error": "export_format must be ndjson or csv."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by("pk")
+        serializer = self.get_serializer()
+        users = (
+            serializer.to_representation(user)
+            for user in queryset.iterator(chunk_size=self.export_chunk_size)
+        )
+
+        if export_format == "csv":
+            content_type = "text/csv"
+            lines = self._csv_lines(serializer.fields, users)
+        else:
+            content_type = "application/x-ndjson"
+            lines = (json.dumps(user, cls=DjangoJSONEncoder) + "\n" for user in users)
+
+        response = StreamingHttpResponse(
+            self._batched(lines, self.export_chunk_size),
+            content_type=content_type,
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="users.{export_format}"'
+        return response
+
+    def _csv_lines(self, fields, users):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        names = list(fields)
+
+        def line(values):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values)
+            return buffer.getvalue()
+
+        yield line(names)
+        for user in users:
+            yield line(
+                self._csv_cell(
+                    ";".join(map(str, user[name]))
+                    if isinstance(user[name], list)
+                    else user[name]
+                )
+                for name in names
+            )
+
+    @staticmethod
+    def _csv_cell(value):
+        # Spreadsheets run cells starting with these as formulas.
+        if isinstance(value, str) and value.startswith(
+            ("=", "+", "-", "@", "\t", "\r")
+        ):
+            return f"'{value}"
+        return value
+
+    @staticmethod
+    def _batched(lines, size):
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= size:
+                yield "".join(batch)
+                batch = []
+        if batch:
+            yield "".join(batch)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("since", description="`next` of the previous page."),
+            OpenApiParameter("limit", int, description="Changes per page."),
+            OpenApiParameter(
+                "wait", int, description="Seconds to wait for changes, long-poll."
+            ),
+            *_sparse_fieldset_parameters,
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(detail=False, methods=["get"])
+    @transaction.non_atomic_requests
+    def changes(self, request, *args, **kwargs):
+        """
+        Users created, updated or deleted since the ``since`` cursor, oldest
+        change first; without a cursor the feed starts from the beginning.
+
+        Each result has an ``action``, the user ``id`` and the ``user``, null
+        for deletes. Pass ``next`` as ``since`` to read on; ``has_more`` tells
+        whether to ask again right away. With ``wait`` the request waits up
+        to that many seconds (``USER_CHANGES['MAX_WAIT']`` at most) for a
+        change. A cursor older than the last tombstone prune answers ``410``:
+        list the users again and follow the feed from a new cursor. The
+        request runs outside ``ATOMIC_REQUESTS``, so a wait holds no
+        transaction open.
+        """
+        try:
+            limit = int(request.query_params.get("limit", 0)) or None
+            wait = int(request.query_params.get("wait", 0))
+        except ValueError:
+            return Response(
+                {"error": "limit and wait must be integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = self.get_serializer()
+        queryset = serializer.optimize_queryset(User.objects.all(), ["updated_at"])
+        try:
+            changes, cursor, has_more = user_change_feed.wait(
+                queryset,
+                cursor=request.query_params.get("since"),
+                limit=limit,
+                timeout=max(wait, 0),
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response(
+                {"error": "Cursor expired, list the users again."},
+                status=status.HTTP_410_GONE,
+            )
+
+        return Response(
+            {
+                "next": cursor,
+                "has_more": has_more,
+                "results": [
+                    {
+                        "action": action,
+                        "id": pk,
+                        "user": user and serializer.to_representation(user),
+                    }
+                    for action, pk, user in changes
+                ],
+            }
+        )
+
+    @extend_schema(
+        request={
+            "text/csv": OpenApiTypes.STR,
+            "application/x-ndjson": OpenApiTypes.STR,
+        },
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[IsAuthenticated, CanImportUsers],
+    )
+    def import_users(self, request, *args, **kwargs):
+        """
+        Bulk import users from a CSV (with a header row) or NDJSON body.
+
+        Needs staff status or ``accounts.add_user``; rows may only ask for
+        roles the caller holds, unless the caller is a superuser.
+
+        Bodies up to ``USER_IMPORT['INLINE_MAX_BYTES']`` are read line by
+        line while the response streams one NDJSON result per row, followed
+        by a summary line. Larger bodies are saved and imported by a task:
+        the ``202`` response names the task and the file its results are
+        saved to.
+        """
+        content_type = request.content_type.split(";")[0].strip()
+        if content_type in CSV_CONTENT_TYPES:
+            input_format, reader = "csv", read_csv
+        elif content_type in NDJSON_CONTENT_TYPES:
+            input_format, reader = "ndjson", read_ndjson
+        else:
+            return Response(
+                {"error": "Send the users as text/csv or application/x-ndjson."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        user = request.user
+        allowed_roles = None if user.is_superuser else [user.role]
+        config = getattr(settings, "USER_IMPORT", {})
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if content_length > config.get("INLINE_MAX_BYTES", 1024 * 1024):
+            stem = f"imports/{uuid.uuid4().hex}"
+            name = default_storage.save(
+                f"{stem}.{input_format}", File(request.stream, name=stem)
+            )
+            results_name = f"{stem}.results.ndjson"
+            queued = import_users_file.enqueue(
+                name, input_format, results_name, allowed_roles=allowed_roles
+            )
+            return Response(
+                {"task": queued.pk, "results": results_name},
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        rows = reader(decode_lines(request.stream or []))
+        # No process pool inside a web worker, large files go to the task.
+        results = UserImporter(hash_workers=0, allowed_roles=allowed_roles).run(rows)
+        return StreamingHttpResponse(
+            (json.dumps(result) + "\n" for result in results),
+            content_type="application/x-ndjson",
+        )
+
+
+class JWKSView(APIView):
+    """
+    Public keys of the JWT key ring as a JWK Set, so other services can
+    verify access tokens locally.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request, *args, **kwargs):
+        response = Response(key_ring_backend.key_ring.jwks)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.JWT_KEY_RING.get("JWKS_MAX_AGE", 3600),
+        )
+        return response
@@ -0,0 +1,49 @@
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from modules.accounts.user_cache import user_snapshot_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves ``request.user`` from the user
+    snapshot cache instead of querying ``accounts_user`` on every request.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Return the cached user identified by the given validated token.
+
+        Falls back to the default lookup when the token is checked against
+        the password hash or users are not identified by primary key, since
+        the snapshot holds neither.
+        """
+        if api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != "id":
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from None
+
+        user = user_snapshot_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """
+    Document ``CachedJWTAuthentication`` as the bearer scheme in the schema.
+    """
+
+    target_class = "modules.accounts.authentication.CachedJWTAuthentication"
@@ -0,0 +1,24 @@
+from django.contrib.auth.backends import ModelBackend
+
+from modules.accounts.permission_cache import user_permission_cache
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ``ModelBackend`` that resolves permissions from the user permission
+    cache, so ``has_perm`` costs no query once a user's set is cached.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Returns:
+            frozenset: The user's own and group permissions as
+            ``"app_label.codename"``.
+        """
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if user_obj.is_superuser:
+            # Every permission; PermissionsMixin short-circuits has_perm for
+            # active superusers, so this is rarely needed.
+            return super().get_all_permissions(user_obj, obj)
+        return user_permission_cache.get(user_obj)
@@ -0,0 +1,263 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken, Token
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from modules.accounts.keyring import KeyRingAccessToken, KeyRingTokenMixin
+from modules.utils.bloom import BloomFilter
+from modules.utils.cache import bump_generation, get_generation, is_process_local
+
+
+class BlacklistFilter:
+    """
+    Per-worker Bloom filter of blacklisted refresh token ``jti`` values.
+
+    A negative answer means the token is definitely not blacklisted and
+    the ``token_blacklist`` tables do not need to be queried. The filter is
+    synced incrementally from ``BlacklistedToken`` using a high-water-mark
+    id whenever the shared generation counter shows another worker
+    blacklisted a token, and at least every ``MAX_STALENESS`` seconds.
+
+    Expired tokens are rejected before the blacklist is consulted, so only
+    blacklisted tokens that have not expired yet are loaded. With a
+    process-local ``CACHE_ALIAS`` other workers' bumps are never seen, so
+    the filter is bypassed and every check goes to the database.
+    """
+
+    generation_key = "accounts:token-blacklist:generation"
+    # Ids below the high-water mark that were not visible on the last sync,
+    # e.g. rows from transactions that committed out of order.
+    gap_window = 1000
+
+    def __init__(self):
+        config = getattr(settings, "TOKEN_BLACKLIST_FILTER", {})
+        self.enabled = config.get("ENABLED", True)
+        self.capacity = config.get("CAPACITY", 100_000)
+        self.error_rate = config.get("ERROR_RATE", 0.001)
+        self.cache_alias = config.get("CACHE_ALIAS", "default")
+        self.max_staleness = config.get("MAX_STALENESS", 30)
+        self.gap_timeout = config.get("GAP_TIMEOUT", 60)
+        self.chunk_size = config.get("CHUNK_SIZE", 10_000)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def reset(self):
+        """
+        Drop the filter so the next lookup rebuilds it from the database.
+        """
+        self._bloom = None
+        self._high_water_mark = 0
+        self._generation = None
+        self._gaps = {}
+        self._synced_at = 0.0
+
+    def might_contain(self, jti):
+        """
+        Check whether a token may be blacklisted.
+
+        Args:
+            jti (str): The token's JTI claim.
+
+        Returns:
+            bool: False if the token is definitely not blacklisted, True if
+            the database has to be checked.
+        """
+        if not self.enabled or is_process_local(self.shared):
+            return True
+        self.sync()
+        return jti in self._bloom
+
+    def add(self, jti):
+        """
+        Record a token blacklisted by this worker without waiting for the
+        next sync.
+        """
+        if self.enabled and self._bloom is not None:
+            self._bloom.add(jti)
+
+    def bump_generation(self):
+        """
+        Tell every worker that ``BlacklistedToken`` changed.
+        """
+        bump_generation(self.shared, self.generation_key)
+
+    def sync(self, force=False):
+        """
+        Bring the filter up to date with ``BlacklistedToken`` if another
+        worker changed it or the filter is older than ``MAX_STALENESS``.
+        """
+        generation = get_generation(self.shared, self.generation_key)
+        if (
+            not force
+            and self._bloom is not None
+            and generation == self._generation
+            and time.monotonic() - self._synced_at < self.max_staleness
+        ):
+            return
+
+        with self._lock:
+            if self._bloom is None or self._bloom.is_full:
+                self._rebuild()
+            else:
+                self._sync_new_rows()
+            self._generation = generation
+            self._synced_at = time.monotonic()
+
+    def _live_rows(self):
+        return BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now(),
+        ).order_by("id")
+
+    def _rebuild(self):
+        capacity = max(self.capacity, 2 * self._live_rows().count())
+        bloom = BloomFilter(capacity, self.error_rate)
+        high_water_mark = 0
+        rows = self._live_rows().values_list("id", "token__jti")
+        for pk, jti in rows.iterator(chunk_size=self.chunk_size):
+            bloom.add(jti)
+            high_water_mark = pk
+
+        max_id = (
+            BlacklistedToken.objects.order_by("-id")
+            .values_list("id", flat=True)
+            .first()
+        ) or 0
+        recent = set(
+            BlacklistedToken.objects.filter(
+                id__gt=max_id - self.gap_window,
+            ).values_list("id", flat=True)
+        )
+        now = time.monotonic()
+        self._gaps = {
+            pk: now
+            for pk in range(max(max_id - self.gap_window, 0) + 1, max_id + 1)
+            if pk not in recent
+        }
+        self._bloom = bloom
+        self._high_water_mark = max(high_water_mark, max_id)
+
+    def _sync_new_rows(self):
+        now = time.monotonic()
+        self._gaps = {
+            pk: seen for pk, seen in self._gaps.items() if now - seen < self.gap_timeout
+        }
+        rows = BlacklistedToken.objects.filter(
+            id__gt=self._high_water_mark,
+        )
+        if self._gaps:
+            rows = rows | BlacklistedToken.objects.filter(id__in=list(self._gaps))
+
+        found = []
+        for pk, jti in rows.order_by("id").values_list("id", "token__jti"):
+            self._bloom.add(jti)
+            self._gaps.pop(pk, None)
+            found.append(pk)
+
+        new_ids = [pk for pk in found if pk > self._high_water_mark]
+        if new_ids:
+            seen = set(new_ids)
+            for pk in range(self._high_water_mark + 1, new_ids[-1]):
+                if pk not in seen:
+                    self._gaps[pk] = now
+            self._high_water_mark = new_ids[-1]
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    Refresh token that consults the in-memory blacklist filter before
+    querying the ``token_blacklist`` tables, and is signed with the key
+    ring like the access tokens it issues.
+    """
+
+    access_token_class = KeyRingAccessToken
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.might_contain(jti):
+            super().check_blacklist()
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+    async def acheck_blacklist(self):
+        """
+        Async ``check_blacklist`` for the ASGI views.
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        # The filter only queries the database when it needs to sync.
+        if await sync_to_async(blacklist_filter.might_contain)(jti):
+            if await BlacklistedToken.objects.filter(token__jti=jti).aexists():
+                raise TokenError(_("Token is blacklisted"))
+
+    async def ablacklist(self):
+        """
+        Async ``blacklist`` for the ASGI views.
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token, _created = await OutstandingToken.objects.aget_or_create(
+            jti=jti,
+            defaults={
+                "token": str(self),
+                "expires_at": datetime_from_epoch(self.payload["exp"]),
+            },
+        )
+        blacklisted = await BlacklistedToken.objects.aget_or_create(token=token)
+        blacklist_filter.add(jti)
+        return blacklisted
+
+    @classmethod
+    async def afrom_string(cls, token):
+        """
+        Decode and verify an encoded token like ``cls(token)`` does, with
+        the blacklist lookup made through the async ORM.
+
+        Raises:
+            TokenError: The token is invalid, expired or blacklisted.
+        """
+        instance = cls(token, verify=False)
+        try:
+            instance.payload = instance.get_token_backend().decode(token)
+        except TokenBackendError as e:
+            raise TokenError(_("Token is invalid or expired")) from e
+        # Token.verify checks the claims; BlacklistMixin.verify would add
+        # the synchronous blacklist query.
+        Token.verify(instance)
+        await instance.acheck_blacklist()
+        return instance
+
+    @classmethod
+    async def afor_user(cls, user):
+        """
+        Async ``for_user``, recording the outstanding token with the async
+        ORM.
+        """
+        token = super(BlacklistMixin, cls).for_user(user)
+        await OutstandingToken.objects.acreate(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"]),
+        )
+        return token
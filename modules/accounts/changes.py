@@ -0,0 +1,174 @@
+import base64
+import heapq
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from modules.accounts.models import UserTombstone
+from modules.accounts.pruning import tombstones_pruned_until
+from modules.accounts.response_cache import user_response_cache
+from modules.utils.cache import get_generation
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    """
+    Tombstones newer than the cursor have been pruned, so deletes may have
+    been missed.
+    """
+
+
+def encode_cursor(timestamp, pk):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: The ``(timestamp, id)`` of the last change read.
+
+    Raises:
+        InvalidCursor: If ``cursor`` was not issued by ``encode_cursor``.
+    """
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        timestamp, pk = datetime.fromisoformat(timestamp), int(pk)
+    except ValueError as e:
+        raise InvalidCursor("Invalid cursor.") from e
+    if timezone.is_naive(timestamp):
+        raise InvalidCursor("Invalid cursor.")
+    return timestamp, pk
+
+
+class UserChangeFeed:
+    """
+    Users created, updated or deleted since a cursor, in ``(updated_at,
+    id)`` order.
+
+    Saved users are read along the ``(updated_at, id)`` index and deleted
+    ones along the tombstone index, and the two are merged, so a page costs
+    two index range scans however large the table is.
+
+    Changes newer than ``SETTLE`` seconds are held back: ``updated_at`` is
+    set before the transaction commits, and a row committed late must not
+    land behind a cursor that was already handed out. ``SETTLE`` must
+    therefore exceed the longest transaction that saves or deletes users;
+    changes of a longer one can be skipped by readers. Keep such
+    transactions under it, e.g. with the database's transaction timeout.
+
+    Cursors from before the tombstone prune watermark, see
+    ``prune_user_tombstones``, are rejected.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "USER_CHANGES", {})
+        self.page_size = config.get("PAGE_SIZE", 100)
+        self.max_page_size = config.get("MAX_PAGE_SIZE", 1000)
+        self.max_wait = config.get("MAX_WAIT", 25)
+        self.poll_interval = config.get("POLL_INTERVAL", 0.5)
+        self.settle = config.get("SETTLE", 2)
+
+    def read(self, queryset, cursor=None, limit=None):
+        """
+        Args:
+            queryset (QuerySet): The users to read from.
+            cursor (str, optional): ``next`` of the previous page; the first
+            page starts from the beginning.
+            limit (int, optional): Maximum number of changes.
+
+        Returns:
+            tuple: A list of ``(action, id, user)`` with ``action`` one of
+            ``created``, ``updated`` and ``deleted`` and ``user`` None for
+            deletes, the cursor of the last change, and whether more changes
+            are ready.
+
+        Raises:
+            InvalidCursor: If ``cursor`` cannot be decoded.
+            CursorExpired: If tombstones newer than ``cursor`` were pruned.
+        """
+        limit = min(limit or self.page_size, self.max_page_size)
+        now = timezone.now()
+        until = now - timedelta(seconds=self.settle)
+        users = queryset.filter(updated_at__lt=until).annotate(
+            feed_created_at=F("created_at")
+        )
+        tombstones = UserTombstone.objects.filter(deleted_at__lt=until)
+
+        since = None
+        if cursor:
+            since, pk = decode_cursor(cursor)
+            pruned_until = tombstones_pruned_until()
+            if pruned_until is not None and since < pruned_until:
+                raise CursorExpired
+            users = users.filter(
+                Q(updated_at__gt=since) | Q(updated_at=since, pk__gt=pk)
+            )
+            tombstones = tombstones.filter(
+                Q(deleted_at__gt=since) | Q(deleted_at=since, user_id__gt=pk)
+            )
+
+        saved = (
+            (user.updated_at, user.pk, user)
+            for user in users.order_by("updated_at", "pk")[: limit + 1]
+        )
+        deleted = (
+            (tombstone.deleted_at, tombstone.user_id, None)
+            for tombstone in tombstones.order_by("deleted_at", "user_id")[: limit + 1]
+        )
+        merged = list(heapq.merge(saved, deleted, key=lambda change: change[:2]))
+
+        changes = []
+        for _, pk, user in merged[:limit]:
+            if user is None:
+                action = "deleted"
+            elif since is None or user.feed_created_at > since:
+                action = "created"
+            else:
+                action = "updated"
+            changes.append((action, pk, user))
+
+        if merged:
+            timestamp, pk, _ = merged[:limit][-1]
+            cursor = encode_cursor(timestamp, pk)
+        return changes, cursor, len(merged) > limit
+
+    def wait(self, queryset, cursor=None, limit=None, timeout=0):
+        """
+        ``read``, waiting up to ``timeout`` seconds for changes when there
+        are none yet.
+
+        The database is only queried again once the users response cache
+        generation moves, i.e. a user change committed, and then until that
+        change has settled. With a process-local cache, changes made by
+        other processes are only seen at the end of the wait.
+        """
+        deadline = time.monotonic() + min(timeout, self.max_wait)
+        generation = self._generation()
+        recheck_until = 0
+        while True:
+            result = self.read(queryset, cursor, limit)
+            if result[0] or time.monotonic() >= deadline:
+                return result
+            while True:
+                time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+                current = self._generation()
+                if current != generation:
+                    generation = current
+                    recheck_until = time.monotonic() + self.settle + self.poll_interval
+                    break
+                if time.monotonic() < recheck_until or time.monotonic() >= deadline:
+                    break
+
+    def _generation(self):
+        return get_generation(
+            user_response_cache.shared, user_response_cache.generation_key
+        )
+
+
+user_change_feed = UserChangeFeed()
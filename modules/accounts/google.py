@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import weakref
+
+import httpx
+import jwt
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from jwt import InvalidTokenError, PyJWKSet
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class GoogleTokenError(Exception):
+    """
+    The token was rejected by Google or failed local verification.
+    """
+
+
+class GoogleUnavailableError(Exception):
+    """
+    Google could not be reached or answered with a server error.
+    """
+
+
+class GoogleTokenVerifier:
+    """
+    Resolve Google sign-in tokens to the signed-in account's profile.
+
+    In ``userinfo`` mode the OAuth access token is sent to the userinfo
+    endpoint through a pooled session with timeouts and retries, and the
+    result is cached for ``CACHE_TIMEOUT`` seconds under a hash of the
+    token. In ``id_token`` mode the token is an OpenID Connect ID token that
+    is verified locally against Google's signing certificates, which are
+    fetched once per ``Cache-Control`` lifetime instead of once per login.
+
+    The ``a``-prefixed methods do the same through a pooled ``httpx``
+    client, one per event loop, for the ASGI views.
+    """
+
+    key_prefix = "accounts:google-userinfo:v1"
+
+    def __init__(self, config=None):
+        if config is None:
+            config = getattr(settings, "GOOGLE_SIGN_IN", {})
+        self.mode = config.get("MODE", "userinfo")
+        self.userinfo_url = config.get(
+            "USERINFO_URL", "https://www.googleapis.com/oauth2/v2/userinfo"
+        )
+        self.certs_url = config.get(
+            "CERTS_URL", "https://www.googleapis.com/oauth2/v3/certs"
+        )
+        self.client_ids = config.get("CLIENT_IDS", [])
+        self.issuers = config.get(
+            "ISSUERS", ["accounts.google.com", "https://accounts.google.com"]
+        )
+        self.timeout = config.get("TIMEOUT", (3.05, 5))
+        self.retries = config.get("RETRIES", 2)
+        self.pool_size = config.get("POOL_SIZE", 10)
+        self.cache_alias = config.get("CACHE_ALIAS", "default")
+        self.cache_timeout = config.get("CACHE_TIMEOUT", 120)
+        self.certs_max_age = config.get("CERTS_MAX_AGE", 3600)
+        self.leeway = config.get("LEEWAY", 30)
+        self._certs = None
+        self._certs_expire_at = 0.0
+        self._certs_fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    @cached_property
+    def session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def verify(self, token):
+        """
+        Verify a Google token.
+
+        Args:
+            token (str): OAuth access token, or ID token in ``id_token``
+            mode.
+
+        Returns:
+            dict: The account's ``email`` and ``name``.
+
+        Raises:
+            GoogleTokenError: The token is invalid or expired.
+            GoogleUnavailableError: Google could not be asked.
+        """
+        if self.mode == "id_token":
+            return self.verify_id_token(token)
+        return self.verify_access_token(token)
+
+    def verify_access_token(self, token):
+        key = self._cache_key(token)
+        profile = self.shared.get(key)
+        if profile is None:
+            response = self._get(self.userinfo_url, params={"access_token": token})
+            profile = self._userinfo_profile(response)
+            self.shared.set(key, profile, self.cache_timeout)
+        return profile
+
+    def verify_id_token(self, token):
+        kid = self._unverified_kid(token)
+        with self._lock:
+            if not self._certs_fresh(kid):
+                self._store_certs(self._get(self.certs_url))
+        return self._id_token_profile(token, kid)
+
+    async def averify(self, token):
+        """
+        Async ``verify``.
+        """
+        if self.mode == "id_token":
+            return await self.averify_id_token(token)
+        return await self.averify_access_token(token)
+
+    async def averify_access_token(self, token):
+        key = self._cache_key(token)
+        profile = await self.shared.aget(key)
+        if profile is None:
+            response = await self._aget(
+                self.userinfo_url, params={"access_token": token}
+            )
+            profile = self._userinfo_profile(response)
+            await self.shared.aset(key, profile, self.cache_timeout)
+        return profile
+
+    async def averify_id_token(self, token):
+        kid = self._unverified_kid(token)
+        if not self._certs_fresh(kid):
+            # Concurrent logins may refetch together; the response is small.
+            self._store_certs(await self._aget(self.certs_url))
+        return self._id_token_profile(token, kid)
+
+    def _cache_key(self, token):
+        return f"{self.key_prefix}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+    def _userinfo_profile(self, response):
+        if response.status_code in (400, 401, 403):
+            raise GoogleTokenError("Google token is invalid or expired.")
+        if response.status_code != 200:
+            raise GoogleUnavailableError(
+                f"Google API request failed: {response.status_code}"
+            )
+        data = response.json()
+        return {"email": data.get("email"), "name": data.get("name", "")}
+
+    def _unverified_kid(self, token):
+        try:
+            return jwt.get_unverified_header(token).get("kid")
+        except InvalidTokenError as ex:
+            raise GoogleTokenError("Google token is invalid or expired.") from ex
+
+    def _certs_fresh(self, kid):
+        now = time.monotonic()
+        if self._certs is None or now >= self._certs_expire_at:
+            return False
+        # Google rotated its keys before our copy expired. Unknown kids
+        # trigger at most one refetch a minute.
+        return kid in self._certs or now - self._certs_fetched_at < 60
+
+    def _store_certs(self, response):
+        if response.status_code != 200:
+            raise GoogleUnavailableError(
+                f"Google certificates request failed: {response.status_code}"
+            )
+        self._certs = {
+            key.key_id: key for key in PyJWKSet.from_dict(response.json()).keys
+        }
+        self._certs_fetched_at = time.monotonic()
+        self._certs_expire_at = self._certs_fetched_at + self._max_age(response)
+
+    def _id_token_profile(self, token, kid):
+        try:
+            key = self._certs[kid]
+        except KeyError:
+            raise GoogleTokenError("Google token is invalid or expired.") from None
+        try:
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=["RS256"],
+                audience=self.client_ids,
+                leeway=self.leeway,
+                options={"require": ["exp", "iss", "aud"]},
+            )
+        except InvalidTokenError as ex:
+            raise GoogleTokenError("Google token is invalid or expired.") from ex
+        if claims["iss"] not in self.issuers:
+            raise GoogleTokenError("Google token is invalid or expired.")
+        return {
+            "email": claims.get("email") if claims.get("email_verified") else None,
+            "name": claims.get("name", ""),
+        }
+
+    def _max_age(self, response):
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else self.certs_max_age
+
+    def _get(self, url, **kwargs):
+        try:
+            return self.session.get(url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as ex:
+            raise GoogleUnavailableError(f"Google API request failed: {ex}") from ex
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            connect, read = (
+                self.timeout
+                if isinstance(self.timeout, (tuple, list))
+                else (self.timeout, self.timeout)
+            )
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def _aget(self, url, **kwargs):
+        client = self._async_client()
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.get(url, **kwargs)
+            except httpx.HTTPError as ex:
+                raise GoogleUnavailableError(
+                    f"Google API request failed: {ex!r}"
+                ) from ex
+            if response.status_code not in (502, 503, 504):
+                break
+            await asyncio.sleep(0.2 * 2**attempt)
+        return response
+
+
+google_token_verifier = GoogleTokenVerifier()
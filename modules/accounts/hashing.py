@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from modules.utils.executors import BoundedExecutor
+
+config = getattr(settings, "ASYNC_AUTH", {})
+
+# Shared by the async auth views so the event loop never hashes itself.
+password_executor = BoundedExecutor(
+    max_workers=config.get("HASH_WORKERS", 4),
+    max_pending=config.get("MAX_PENDING_HASHES", 512),
+    thread_name_prefix="password-hasher",
+)
+
+
+async def amake_password(password):
+    """
+    Hash ``password`` in the password executor.
+
+    Returns:
+        str: The encoded password, unusable when ``password`` is None.
+    """
+    return await password_executor.run(make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """
+    Check ``password`` against ``encoded`` in the password executor. Hashes
+    using outdated parameters are not upgraded.
+
+    Returns:
+        bool: Whether the password matches.
+    """
+    return await password_executor.run(check_password, password, encoded)
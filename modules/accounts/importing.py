@@ -0,0 +1,240 @@
+import codecs
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from modules.accounts.api.serializers import UserImportSerializer
+from modules.accounts.models import get_profile_model
+from modules.accounts.response_cache import user_response_cache
+from modules.utils.processes import setup_django
+
+User = get_user_model()
+
+CSV_CONTENT_TYPES = ("text/csv",)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+
+def decode_lines(byte_lines):
+    """
+    Decode an iterable of UTF-8 byte lines, dropping a leading BOM.
+    """
+    return codecs.iterdecode(byte_lines, "utf-8-sig")
+
+
+def read_csv(lines):
+    """
+    Yield ``(row_number, row)`` pairs from CSV lines with a header row.
+    """
+    for number, row in enumerate(csv.DictReader(lines), start=1):
+        yield number, row
+
+
+def read_ndjson(lines):
+    """
+    Yield ``(row_number, row)`` pairs from newline-delimited JSON lines.
+    Lines that are not valid JSON yield None as the row.
+    """
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+class UserImporter:
+    """
+    Streams user rows into the database in fixed-size chunks.
+
+    Every chunk is validated, checked for existing emails and phone numbers
+    with one query, hashed across a process pool and written with
+    ``bulk_create`` in one transaction, so memory use only depends on the
+    chunk size. Profiles are bulk created alongside since ``bulk_create``
+    does not send ``post_save``. When a concurrent write makes the chunk
+    fail, its rows are retried one by one in savepoints so only the
+    conflicting rows are reported.
+
+    With ``allowed_roles``, rows asking for any other role are refused, so
+    callers cannot grant roles they do not hold.
+    """
+
+    def __init__(self, chunk_size=None, hash_workers=None, allowed_roles=None):
+        config = getattr(settings, "USER_IMPORT", {})
+        self.allowed_roles = allowed_roles
+        self.chunk_size = chunk_size or config.get("CHUNK_SIZE", 1000)
+        self.hash_workers = (
+            config.get("HASH_WORKERS", 0) if hash_workers is None else hash_workers
+        )
+
+    def run(self, rows):
+        """
+        Import ``(row_number, row)`` pairs.
+
+        Yields:
+            dict: One result per row, in input order, then a summary.
+        """
+        created = failed = 0
+        if self.hash_workers > 1:
+            executor = ProcessPoolExecutor(
+                self.hash_workers,
+                initializer=setup_django,
+            )
+        else:
+            executor = None
+
+        with executor or nullcontext():
+            rows = iter(rows)
+            while chunk := list(islice(rows, self.chunk_size)):
+                for result in self.import_chunk(chunk, executor):
+                    if result["status"] == "created":
+                        created += 1
+                    else:
+                        failed += 1
+                    yield result
+
+        yield {"summary": {"created": created, "failed": failed}}
+
+    def import_chunk(self, chunk, executor=None):
+        results = {}
+        valid = []
+        emails, phones = set(), set()
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                results[number] = self._error(number, {"row": ["Invalid row."]})
+                continue
+            serializer = UserImportSerializer(data=row)
+            if not serializer.is_valid():
+                results[number] = self._error(number, serializer.errors)
+                continue
+            data = serializer.validated_data
+            if self.allowed_roles is not None and (
+                data["role"] not in self.allowed_roles
+            ):
+                results[number] = self._error(
+                    number, {"role": ["You cannot grant this role."]}
+                )
+                continue
+            data["email"] = User.objects.normalize_email(data["email"])
+            data["phone_no"] = data.get("phone_no") or None
+            if data["email"] in emails:
+                results[number] = self._duplicate(number, "email")
+            elif data["phone_no"] and data["phone_no"] in phones:
+                results[number] = self._duplicate(number, "phone_no")
+            else:
+                emails.add(data["email"])
+                if data["phone_no"]:
+                    phones.add(data["phone_no"])
+                valid.append((number, data))
+
+        existing_emails, existing_phones = set(), set()
+        if valid:
+            existing = User.objects.filter(
+                Q(email__in=emails) | Q(phone_no__in=phones)
+            ).values_list("email", "phone_no")
+            for email, phone_no in existing:
+                existing_emails.add(email)
+                existing_phones.add(phone_no)
+
+        pending = []
+        for number, data in valid:
+            if data["email"] in existing_emails:
+                results[number] = self._duplicate(number, "email")
+            elif data["phone_no"] and data["phone_no"] in existing_phones:
+                results[number] = self._duplicate(number, "phone_no")
+            else:
+                pending.append((number, data))
+
+        for number, user in self._create(pending, executor):
+            if user is None:
+                results[number] = self._error(
+                    number,
+                    {"row": ["Conflicts with a concurrent write, retry the row."]},
+                )
+            else:
+                results[number] = {
+                    "row": number,
+                    "status": "created",
+                    "id": user.pk,
+                    "email": user.email,
+                }
+
+        return [results[number] for number, _ in chunk]
+
+    def _create(self, pending, executor):
+        if not pending:
+            return []
+
+        passwords = [data.get("password") or None for _, data in pending]
+        to_hash = [password for password in passwords if password]
+        if executor:
+            hashed = iter(executor.map(make_password, to_hash, chunksize=32))
+        else:
+            hashed = iter(map(make_password, to_hash))
+
+        users = []
+        for (_, data), password in zip(pending, passwords, strict=True):
+            users.append(
+                User(
+                    email=data["email"],
+                    name=data.get("name", ""),
+                    phone_no=data["phone_no"],
+                    role=data["role"],
+                    is_active=data["is_active"],
+                    password=next(hashed) if password else make_password(None),
+                )
+            )
+
+        try:
+            with transaction.atomic():
+                self._insert(users)
+        except IntegrityError:
+            users = [self._insert_one(user) for user in users]
+
+        if any(users):
+            # bulk_create sends no post_save to invalidate_user_responses
+            user_response_cache.invalidate()
+        return [
+            (number, user) for (number, _), user in zip(pending, users, strict=True)
+        ]
+
+    def _insert(self, users):
+        User.objects.bulk_create(users)
+        profiles = {}
+        for user in users:
+            profile_model = get_profile_model(user)
+            if profile_model:
+                profiles.setdefault(profile_model, []).append(profile_model(user=user))
+        for profile_model, objs in profiles.items():
+            profile_model.objects.bulk_create(objs)
+
+    def _insert_one(self, user):
+        """
+        Returns:
+            User: ``user`` once inserted, or None if it conflicts.
+        """
+        # The failed bulk insert may have assigned primary keys.
+        user.pk = None
+        user._state.adding = True
+        try:
+            with transaction.atomic():
+                self._insert([user])
+        except IntegrityError:
+            return None
+        return user
+
+    def _error(self, number, errors):
+        return {"row": number, "status": "error", "errors": errors}
+
+    def _duplicate(self, number, field):
+        return self._error(number, {field: ["A user with this value already exists."]})
@@ -0,0 +1,221 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from jwt import InvalidAlgorithmError, InvalidTokenError
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend as legacy_backend
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """
+    A parsed key of the key ring. ``private_key`` is None for retired keys
+    that are only kept to verify tokens issued before a rotation.
+    """
+
+    kid: str
+    algorithm: str
+    public_key: object
+    private_key: object = None
+
+    def to_jwk(self):
+        """
+        Returns:
+            dict: The public key as a JSON Web Key.
+        """
+        if isinstance(self.public_key, rsa.RSAPublicKey):
+            jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        elif isinstance(self.public_key, ec.EllipticCurvePublicKey):
+            jwk = ECAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+def _algorithm_for(public_key):
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}[
+            public_key.curve.name
+        ]
+    if isinstance(public_key, (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)):
+        return "EdDSA"
+    raise ValueError(f"Unsupported JWT signing key type {type(public_key)}")
+
+
+def load_key(kid, pem):
+    """
+    Parse a PEM encoded private or public key into a ``SigningKey``.
+
+    Args:
+        kid (str): Key id written to the ``kid`` header of signed tokens.
+        pem (bytes): PEM encoded private key, or public key for a retired
+        verify-only key.
+
+    Returns:
+        SigningKey: The parsed key.
+    """
+    try:
+        private_key = load_pem_private_key(pem, password=None)
+        public_key = private_key.public_key()
+    except ValueError:
+        private_key = None
+        public_key = load_pem_public_key(pem)
+    return SigningKey(kid, _algorithm_for(public_key), public_key, private_key)
+
+
+class KeyRing:
+    """
+    Asymmetric JWT keys loaded once per process from ``JWT_KEY_RING``.
+
+    Every ``<kid>.pem`` file in ``KEYS_DIR`` is one key. Tokens are signed
+    with ``ACTIVE_KID``, or with the last private key in ``kid`` order, and
+    verified with the key named by their ``kid`` header.
+    """
+
+    def __init__(self, keys=None, active_kid=None):
+        if keys is None:
+            config = getattr(settings, "JWT_KEY_RING", {})
+            keys = self._read_dir(config.get("KEYS_DIR"))
+            active_kid = config.get("ACTIVE_KID")
+        self.keys = {key.kid: key for key in keys}
+
+        signing_kids = sorted(kid for kid, key in self.keys.items() if key.private_key)
+        if active_kid and active_kid not in signing_kids:
+            raise ValueError(f"No private key for active JWT kid {active_kid!r}")
+        self.active_kid = active_kid or (signing_kids[-1] if signing_kids else None)
+
+    @staticmethod
+    def _read_dir(keys_dir):
+        if not keys_dir:
+            return []
+        return [
+            load_key(path.stem, path.read_bytes())
+            for path in sorted(Path(keys_dir).glob("*.pem"))
+        ]
+
+    def __bool__(self):
+        return self.active_kid is not None
+
+    @property
+    def active(self):
+        return self.keys[self.active_kid]
+
+    @cached_property
+    def jwks(self):
+        """
+        Returns:
+            dict: The JWK Set of every key in the ring.
+        """
+        return {"keys": [key.to_jwk() for key in self.keys.values()]}
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Token backend that signs with the key ring's active key and picks the
+    verifying key from the token's ``kid`` header.
+
+    When the ring is empty the ``SIMPLE_JWT`` backend is used instead. Tokens
+    without a ``kid`` are only accepted once the ring has keys while
+    ``JWT_KEY_RING["ACCEPT_LEGACY"]`` is set, which should be for no longer
+    than the access token lifetime after the switch.
+    """
+
+    def __init__(self, key_ring=None):
+        super().__init__(
+            "RS256",
+            audience=api_settings.AUDIENCE,
+            issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+        self._key_ring = key_ring
+
+    @cached_property
+    def key_ring(self):
+        return self._key_ring if self._key_ring is not None else KeyRing()
+
+    @property
+    def accept_legacy(self):
+        return getattr(settings, "JWT_KEY_RING", {}).get("ACCEPT_LEGACY", False)
+
+    def encode(self, payload):
+        if not self.key_ring:
+            return legacy_backend.encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        key = self.key_ring.active
+        return jwt.encode(
+            jwt_payload,
+            key.private_key,
+            algorithm=key.algorithm,
+            headers={"kid": key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+        if kid is None and (self.accept_legacy or not self.key_ring):
+            return legacy_backend.decode(token, verify=verify)
+
+        key = self.key_ring.keys.get(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid or expired"))
+
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    "verify_aud": self.audience is not None,
+                    "verify_signature": verify,
+                },
+            )
+        except InvalidAlgorithmError as ex:
+            raise TokenBackendError(_("Invalid algorithm specified")) from ex
+        except InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+
+key_ring_backend = KeyRingTokenBackend()
+
+
+class KeyRingTokenMixin:
+    """
+    Sign and verify a simplejwt token class through the key ring.
+    """
+
+    def get_token_backend(self):
+        return key_ring_backend
+
+
+class KeyRingAccessToken(KeyRingTokenMixin, AccessToken):
+    pass
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class LastLoginRecorder:
+    """
+    Buffers ``last_login`` timestamps in memory and writes them with one
+    bulk ``UPDATE`` from a background thread.
+
+    Logins only touch the buffer, once their transaction commits, so they
+    no longer rewrite the user row or hold its lock for the rest of the
+    request transaction. ``last_login`` lags by at most ``FLUSH_INTERVAL``
+    seconds; on a graceful shutdown the buffer is flushed once, for at most
+    ``SHUTDOWN_TIMEOUT`` seconds, and a killed worker loses at most one
+    interval of timestamps. A timestamp never replaces a newer one.
+
+    Only ``last_login`` is written: ``updated_at`` and ``updated_flag`` are
+    left alone, so logins do not change ETags, retire the users response
+    cache or show up in the change feed. ``last_login`` in API responses
+    may therefore lag until the user's next real change or the cache
+    ``TIMEOUT``.
+
+    Under uWSGI the flush thread needs ``enable-threads``.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "LAST_LOGIN_RECORDER", {})
+        self.enabled = config.get("ENABLED", True)
+        self.flush_interval = config.get("FLUSH_INTERVAL", 30)
+        self.max_pending = config.get("MAX_PENDING", 5000)
+        self.shutdown_timeout = config.get("SHUTDOWN_TIMEOUT", 5)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user, when=None):
+        """
+        Set ``user.last_login`` and queue it for the next flush once the
+        current transaction commits.
+
+        Args:
+            user (User): The user who logged in.
+            when (datetime, optional): Login time, defaults to now.
+        """
+        user.last_login = when or timezone.now()
+        if not self.enabled:
+            user.save(update_fields=["last_login"])
+            return
+        transaction.on_commit(lambda: self._add(user.pk, user.last_login))
+
+    def _add(self, pk, when):
+        with self._lock:
+            previous = self._pending.get(pk)
+            if previous is None or previous < when:
+                self._pending[pk] = when
+            pending = len(self._pending)
+            self._ensure_thread()
+
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write every buffered timestamp in a single statement.
+
+        Returns:
+            int: Number of users updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            if connection.vendor == "postgresql":
+                updated = self._flush_values(pending)
+            else:
+                last_login = Case(
+                    *(When(pk=pk, then=Value(when)) for pk, when in pending.items())
+                )
+                updated = (
+                    User.objects.filter(pk__in=pending)
+                    .filter(Q(last_login__isnull=True) | Q(last_login__lt=last_login))
+                    .update(
+                        last_login=last_login,
+                        updated_at=F("updated_at"),
+                        updated_flag=F("updated_flag"),
+                    )
+                )
+        except Exception:
+            # Keep the timestamps for the next attempt unless newer ones
+            # were recorded meanwhile.
+            with self._lock:
+                for pk, when in pending.items():
+                    self._pending.setdefault(pk, when)
+            raise
+
+        return updated
+
+    def _flush_values(self, pending):
+        table = connection.ops.quote_name(User._meta.db_table)
+        rows = ", ".join(["(%s::bigint, %s::timestamptz)"] * len(pending))
+        params = [value for item in pending.items() for value in item]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS u "
+                "SET last_login = v.last_login "
+                f"FROM (VALUES {rows}) AS v(id, last_login) "
+                "WHERE u.id = v.id "
+                "AND (u.last_login IS NULL OR u.last_login < v.last_login)",
+                params,
+            )
+            return cursor.rowcount
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="last-login-recorder",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush last_login timestamps")
+            finally:
+                connections.close_all()
+
+    def shutdown(self):
+        """
+        Flush the buffer, giving up after ``shutdown_timeout`` seconds so a
+        locked table cannot hold up the exit.
+        """
+        if not self._pending:
+            return
+        thread = threading.Thread(
+            target=self._flush_on_exit,
+            name="last-login-recorder-exit",
+            daemon=True,
+        )
+        thread.start()
+        thread.join(self.shutdown_timeout)
+        if thread.is_alive():
+            logger.warning(
+                "Gave up flushing last_login timestamps on exit after %ss",
+                self.shutdown_timeout,
+            )
+
+    def _flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not flush last_login timestamps on exit")
+        finally:
+            connections.close_all()
+
+
+last_login_recorder = LastLoginRecorder()
+atexit.register(last_login_recorder.shutdown)
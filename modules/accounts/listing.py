@@ -0,0 +1,97 @@
+from django.template.loader import render_to_string
+
+from modules.accounts.models import User
+
+# Columns shown in the user listing of the home page.
+LISTING_FIELDS = (
+    "id",
+    "email",
+    "name",
+    "phone_no",
+    "role",
+    "timestamp",
+    "is_active",
+    "is_superuser",
+)
+
+
+class UserPage:
+    """
+    One page of the home page user listing, newest users first.
+
+    Pages are keyed by user id rather than offset: ``after`` selects the
+    page below that user and ``before`` the page above it, so every page is
+    an index range scan however deep it is. Iterating renders the rows in
+    chunks of ``chunk_size`` read through a chunked cursor; ``previous``
+    and ``next`` hold the pager cursors once iteration is done.
+    """
+
+    rows_template = "pages/includes/user_rows.html"
+    pager_template = "pages/includes/user_pager.html"
+
+    def __init__(self, after=None, before=None, page_size=100, chunk_size=25):
+        """
+        Args:
+            after (int, optional): Show the users with a lower id.
+            before (int, optional): Show the users with a higher id.
+            page_size (int): Users per page.
+            chunk_size (int): Rows fetched and rendered at a time.
+        """
+        self.after = after
+        self.before = before
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.previous = None
+        self.next = None
+
+    def __iter__(self):
+        queryset, has_previous, has_next = self.get_queryset()
+        chunk, first, last, count = [], None, None, 0
+        for user in queryset.iterator(chunk_size=self.chunk_size):
+            if count == self.page_size:
+                # The extra row fetched to tell whether a next page exists.
+                has_next = True
+                break
+            if first is None:
+                first = user.pk
+            last = user.pk
+            count += 1
+            chunk.append(user)
+            if len(chunk) == self.chunk_size:
+                yield render_to_string(self.rows_template, {"users": chunk})
+                chunk = []
+        if chunk or not count:
+            yield render_to_string(self.rows_template, {"users": chunk})
+
+        self.previous = first if has_previous and count else None
+        self.next = last if has_next and count else None
+
+    def get_queryset(self):
+        """
+        Returns:
+            tuple: The page's users in display order, and whether a previous
+            and a next page are known to exist already.
+        """
+        queryset = User.objects.only(*LISTING_FIELDS).order_by("-pk")
+        if self.before is None:
+            if self.after is not None:
+                queryset = queryset.filter(pk__lt=self.after)
+            return queryset[: self.page_size + 1], self.after is not None, False
+
+        # Find the upper bound of the page walking upwards, then read it in
+        # display order.
+        ids = list(
+            User.objects.filter(pk__gt=self.before)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: self.page_size + 1]
+        )
+        if not ids:
+            return queryset.none(), False, True
+        upper = ids[: self.page_size][-1]
+        queryset = queryset.filter(pk__gt=self.before, pk__lte=upper)
+        return queryset, len(ids) > self.page_size, True
+
+    def render_pager(self):
+        return render_to_string(
+            self.pager_template, {"previous": self.previous, "next": self.next}
+        )
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import uuid
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server's login and refresh endpoints with concurrent "
+        "requests and report throughput and latency. Point --url at the sync "
+        "API under gunicorn (e.g. http://127.0.0.1:8000/api/) and at the "
+        "async API under uvicorn (e.g. http://127.0.0.1:8001/api/async/) to "
+        "compare the two. The benchmark user is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", required=True)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com",
+            password=password,
+            is_active=True,
+        )
+        try:
+            asyncio.run(self.run(user.email, password, options))
+        finally:
+            user.delete()
+
+    async def run(self, email, password, options):
+        base_url = options["url"].rstrip("/") + "/"
+        limits = httpx.Limits(max_connections=options["concurrency"])
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=options["timeout"]
+        ) as client:
+            credentials = {"email": email, "password": password}
+            response = await client.post("login/", json=credentials)
+            response.raise_for_status()
+
+            await self.load(
+                "login",
+                options,
+                lambda: client.post("login/", json=credentials),
+            )
+
+            # Each rotation blacklists its token, so refresh a fresh one.
+            tokens = []
+            for _ in range(options["requests"]):
+                response = await client.post("login/", json=credentials)
+                response.raise_for_status()
+                tokens.append(response.json()["refresh"])
+            await self.load(
+                "refresh",
+                options,
+                lambda: client.post("auth-refresh/", json={"refresh": tokens.pop()}),
+            )
+
+    async def load(self, label, options, send):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        timings = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await send()
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        self.stdout.write(
+            f"{label}: {len(timings) / elapsed:.1f} req/s "
+            f"p50 {timings[len(timings) // 2]:.1f}ms "
+            f"p99 {timings[int(len(timings) * 0.99)]:.1f}ms "
+            f"errors {errors}"
+        )
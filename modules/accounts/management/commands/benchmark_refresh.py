@@ -0,0 +1,110 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from modules.accounts.api.serializers import RefreshSerializer
+from modules.accounts.blacklist import FilteredRefreshToken, blacklist_filter
+from modules.accounts.keyring import KeyRingAccessToken, KeyRingTokenMixin
+from modules.accounts.models import RoleChoices
+
+User = get_user_model()
+
+
+class KeyRingRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    The filtered token without the filter: decoded by the same key ring
+    backend, checked against the blacklist tables on every use.
+    """
+
+    access_token_class = KeyRingAccessToken
+
+
+class SQLBlacklistRefreshSerializer(TokenRefreshSerializer):
+    token_class = KeyRingRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure refresh token rotation latency against a large blacklist, "
+        "with and without the in-memory blacklist filter. All rows are "
+        "created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(
+                f"benchmark-{uuid.uuid4().hex}@example.com",
+                role=RoleChoices.SUPERUSER,
+                is_active=True,
+            )
+            self.fill_blacklist(user, options["rows"], options["batch_size"])
+
+            blacklist_filter.reset()
+            started = time.perf_counter()
+            blacklist_filter.sync(force=True)
+            self.stdout.write(
+                f"filter built from {options['rows']} rows in "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+
+            for label, serializer_class in (
+                ("sql blacklist check", SQLBlacklistRefreshSerializer),
+                ("bloom filter", RefreshSerializer),
+            ):
+                timings = self.run(user, serializer_class, options["requests"])
+                self.report(label, timings)
+
+            transaction.set_rollback(True)
+        blacklist_filter.reset()
+
+    def fill_blacklist(self, user, rows, batch_size):
+        expires_at = timezone.now() + timedelta(days=1)
+        prefix = uuid.uuid4().hex
+        for start in range(0, rows, batch_size):
+            outstanding = OutstandingToken.objects.bulk_create(
+                OutstandingToken(
+                    user=user,
+                    jti=f"{prefix}-{i}",
+                    token="",
+                    expires_at=expires_at,
+                )
+                for i in range(start, min(start + batch_size, rows))
+            )
+            BlacklistedToken.objects.bulk_create(
+                BlacklistedToken(token=token) for token in outstanding
+            )
+
+    def run(self, user, serializer_class, requests):
+        timings = []
+        for _ in range(requests):
+            refresh = str(FilteredRefreshToken.for_user(user))
+            started = time.perf_counter()
+            serializer = serializer_class(data={"refresh": refresh})
+            serializer.is_valid(raise_exception=True)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        timings.sort()
+        self.stdout.write(
+            f"{label}: mean {statistics.mean(timings):.3f}ms "
+            f"p50 {timings[len(timings) // 2]:.3f}ms "
+            f"p99 {timings[int(len(timings) * 0.99)]:.3f}ms"
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from modules.accounts.tokens import account_activation_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure issuing and verifying account activation tokens. Tokens "
+        "need no database, so an unsaved user is used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tokens", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        count = options["tokens"]
+        user = User(pk=1, email="benchmark@example.com", is_active=False)
+
+        started = time.perf_counter()
+        tokens = [account_activation_token.make_token(user) for _ in range(count)]
+        self.report("issue", count, started)
+
+        started = time.perf_counter()
+        valid = sum(account_activation_token.check_token(user, t) for t in tokens)
+        self.report("verify", count, started)
+
+        user.is_active = True
+        started = time.perf_counter()
+        used = sum(account_activation_token.check_token(user, t) for t in tokens)
+        self.report("verify after activation", count, started)
+
+        self.stdout.write(
+            f"{len(tokens[0])} character tokens, {valid} valid, "
+            f"{used} accepted after activation"
+        )
+
+    def report(self, label, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {count / elapsed:.0f} tokens/s "
+            f"({elapsed / count * 1_000_000:.1f}us each)"
+        )
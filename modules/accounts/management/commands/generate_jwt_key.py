@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a new private key to JWT_KEY_RING['KEYS_DIR']. The newest key "
+        "signs tokens unless JWT_ACTIVE_KID is set; older keys keep "
+        "verifying tokens until their files are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--algorithm",
+            choices=["RS256", "EdDSA"],
+            default="EdDSA",
+        )
+        parser.add_argument(
+            "--kid",
+            help="Key id, defaults to the current UTC timestamp.",
+        )
+
+    def handle(self, *args, **options):
+        keys_dir = settings.JWT_KEY_RING.get("KEYS_DIR")
+        if not keys_dir:
+            raise CommandError("Set JWT_KEYS_DIR to generate signing keys.")
+
+        kid = options["kid"] or timezone.now().strftime("%Y%m%d%H%M%S")
+        path = Path(keys_dir) / f"{kid}.pem"
+        if path.exists():
+            raise CommandError(f"{path} already exists.")
+
+        if options["algorithm"] == "RS256":
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            key = ed25519.Ed25519PrivateKey.generate()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+        path.chmod(0o600)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {options['algorithm']} key {path}")
+        )
@@ -0,0 +1,50 @@
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.accounts.importing import UserImporter, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users from a CSV (with a header row) or NDJSON file into the "
+        "database in chunks. Writes one NDJSON result per failed row, or per "
+        "row with --verbosity 2, and a summary line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Password hashing processes (USER_IMPORT['HASH_WORKERS']).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or Path(path).suffix.lstrip(".").lower()
+        readers = {"csv": read_csv, "ndjson": read_ndjson, "jsonl": read_ndjson}
+        if input_format not in readers:
+            raise CommandError("Pass --format csv or --format ndjson.")
+
+        if path == "-":
+            lines = sys.stdin
+        else:
+            lines = open(path, encoding="utf-8-sig", newline="")
+
+        importer = UserImporter(
+            chunk_size=options["chunk_size"],
+            hash_workers=options["workers"],
+        )
+        with lines:
+            for result in importer.run(readers[input_format](lines)):
+                if result.get("status") != "created" or options["verbosity"] > 1:
+                    self.stdout.write(json.dumps(result))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from modules.accounts.pruning import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted JWT refresh tokens in "
+        "small batches, resuming from the last checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows deleted per transaction (TOKEN_PRUNING['BATCH_SIZE']).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            help="Seconds to pause between batches (TOKEN_PRUNING['SLEEP']).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches; the next run resumes.",
+        )
+
+    def handle(self, *args, **options):
+        result = prune_expired_tokens(
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            max_batches=options["max_batches"],
+        )
+        state = "finished" if result["finished"] else "checkpointed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {result['deleted']} rows in {result['batches']} "
+                f"batches ({state})."
+            )
+        )
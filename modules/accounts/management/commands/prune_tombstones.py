@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from modules.accounts.pruning import prune_user_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tombstones of users deleted before the change feed's "
+        "retention in small batches, resuming from the last checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows deleted per transaction (USER_CHANGES['PRUNE_BATCH_SIZE']).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            help="Seconds to pause between batches (USER_CHANGES['PRUNE_SLEEP']).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches; the next run resumes.",
+        )
+
+    def handle(self, *args, **options):
+        result = prune_user_tombstones(
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            max_batches=options["max_batches"],
+        )
+        state = "finished" if result["finished"] else "checkpointed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {result['deleted']} rows in {result['batches']} "
+                f"batches ({state})."
+            )
+        )
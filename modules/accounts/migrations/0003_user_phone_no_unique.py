@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Listed in the error, so operators can resolve the duplicates by hand
+MAX_REPORTED_DUPLICATES = 20
+
+
+def check_duplicate_phone_numbers(apps, schema_editor):
+    """
+    Abort before adding the constraint if phone numbers are already shared.
+
+    Which account keeps a shared number is a business decision, so the
+    duplicates are reported rather than cleared.
+    """
+    User = apps.get_model("accounts", "User")
+    duplicates = (
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(phone_no__isnull=True)
+        .exclude(phone_no="")
+        .values("phone_no")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .order_by("phone_no")
+    )
+    total = duplicates.count()
+    if not total:
+        return
+    report = "\n".join(
+        f"  {row['phone_no']}: "
+        + ", ".join(
+            str(pk)
+            for pk in User.objects.using(schema_editor.connection.alias)
+            .filter(phone_no=row["phone_no"])
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for row in duplicates[:MAX_REPORTED_DUPLICATES]
+    )
+    raise RuntimeError(
+        f"{total} phone number(s) are shared by several users (number: user ids)."
+        f"\n{report}\nClear or correct them, then run migrate again."
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_maintenancecheckpoint"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_phone_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("phone_no", ""), _negated=True),
+                fields=("phone_no",),
+                name="accounts_user_phone_no_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+# The search filter runs icontains lookups, which PostgreSQL compiles to
+# UPPER(column::text) LIKE UPPER(%s); these expression indexes match that.
+SEARCH_FIELDS = ["name", "email", "phone_no"]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_user_{field}_trgm_idx "
+            f'ON accounts_user USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f"DROP INDEX CONCURRENTLY IF EXISTS accounts_user_{field}_trgm_idx"
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0004_user_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["created_at"], name="accounts_user_created_at_idx"
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
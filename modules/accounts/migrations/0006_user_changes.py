@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0005_user_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.BigIntegerField(verbose_name="user id")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="deleted at"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["updated_at", "id"], name="accounts_user_changes_idx"
+            ),
+        ),
+        # The new index leads with updated_at and replaces this one.
+        migrations.RemoveIndex(
+            model_name="user",
+            name="accounts_user_updated_at_idx",
+        ),
+        migrations.AddIndex(
+            model_name="usertombstone",
+            index=models.Index(
+                fields=["deleted_at", "user_id"], name="accounts_tombstone_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0006_user_changes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="maintenancecheckpoint",
+            name="pruned_until",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="pruned until"
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, Group
@@ -16,9 +17,46 @@ class Constants(models.TextChoices):
     NO = "No", ("No")
 
 
+class TrackingQuerySet(models.QuerySet):
+    """
+    QuerySet that maintains ``updated_at`` and ``updated_flag`` on bulk
+    writes, which bypass ``TrackingModel.save``.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        kwargs.setdefault("updated_flag", Constants.YES)
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+            obj.updated_flag = Constants.YES
+        fields = [*fields, "updated_at", "updated_flag"]
+        return super().bulk_update(objs, list(dict.fromkeys(fields)), batch_size)
+
+    def bulk_create(self, objs, *args, update_conflicts=False, **kwargs):
+        # Rows updated on conflict get the insert's updated_at. updated_flag
+        # cannot tell them apart from inserted rows and stays "No".
+        update_fields = kwargs.get("update_fields")
+        if update_conflicts and update_fields:
+            kwargs["update_fields"] = list(
+                dict.fromkeys([*update_fields, "updated_at"])
+            )
+        return super().bulk_create(
+            objs, *args, update_conflicts=update_conflicts, **kwargs
+        )
+
+
 class TrackingModel(models.Model):
     """
     Abstract base model for tracking creation and update timestamps.
+
+    ``updated_flag`` is set on every save of an existing row, and by the
+    ``update`` and ``bulk_update`` of ``TrackingQuerySet``; managers of
+    subclasses must be built on it.
     """
 
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
@@ -30,9 +68,26 @@ class TrackingModel(models.Model):
         default=Constants.NO,
     )
 
+    objects = TrackingQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
+    def save(
+        self, force_insert=False, force_update=False, using=None, update_fields=None
+    ):
+        if not self._state.adding:
+            self.updated_flag = Constants.YES
+            if update_fields:
+                update_fields = {*update_fields, "updated_at", "updated_flag"}
+        super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+
+
 class RoleChoices(models.TextChoices):
     """
     Enumeration of possible user roles.
@@ -85,11 +140,25 @@ class User(AbstractBaseUser, PermissionsMixin, TrackingModel):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
-    objects = UserManager()
+    objects = UserManager.from_queryset(TrackingQuerySet)()
 
     class Meta:
         verbose_name_plural = "users"
         ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["phone_no"],
+                condition=~models.Q(phone_no=""),
+                name="accounts_user_phone_no_unique",
+            ),
+        ]
+        # Trigram indexes for search live in migration 0005, on PostgreSQL only
+        indexes = [
+            # Backs the change feed's (updated_at, id) ranges and max(updated_at)
+            # for conditional GETs on the user list
+            models.Index(fields=["updated_at", "id"], name="accounts_user_changes_idx"),
+            models.Index(fields=["created_at"], name="accounts_user_created_at_idx"),
+        ]
 
     def __str__(self):
         """
@@ -200,3 +269,54 @@ class SuperUser(Profile):
     class Meta:
         verbose_name_plural = "Super Users"
         ordering = ["-id"]
+
+
+class MaintenanceCheckpoint(models.Model):
+    """
+    Resume position of a batched maintenance job, such as token pruning.
+
+    Jobs that prune by age also record ``pruned_until``: rows older than
+    that may be gone.
+    """
+
+    name = models.CharField(_("name"), max_length=100, unique=True)
+    position = models.BigIntegerField(_("position"), default=0)
+    pruned_until = models.DateTimeField(_("pruned until"), null=True, blank=True)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class UserTombstone(models.Model):
+    """
+    Record of a deleted user, read by the users change feed.
+    """
+
+    user_id = models.BigIntegerField(_("user id"))
+    deleted_at = models.DateTimeField(_("deleted at"), default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["deleted_at", "user_id"], name="accounts_tombstone_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} deleted at {self.deleted_at}"
+
+
+def get_profile_model(user):
+    """
+    Return the profile model a user gets on creation.
+
+    Args:
+        user (User): The new user.
+
+    Returns:
+        type: The profile model, or None if the user's role has none.
+    """
+    if user.is_superuser or user.is_staff:
+        return SuperUser
+    return {RoleChoices.SUPERUSER: SuperUser}.get(user.role)
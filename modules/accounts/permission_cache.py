@@ -0,0 +1,148 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+
+from modules.utils.cache import (
+    LocalLRUCache,
+    bump_generation,
+    get_generation,
+    is_process_local,
+)
+
+
+class UserPermissionCache:
+    """
+    Two-tier cache of each user's effective permissions, their own and
+    their groups', compiled into a frozenset of ``"app_label.codename"``.
+
+    A miss costs one query. Changing a user's groups or permissions drops
+    that user's entry; changing a group's permissions can affect any
+    number of users, so it bumps a generation counter that is part of
+    every key instead.
+
+    When ``CACHE_ALIAS`` is process-local only the LRU is used, and
+    invalidations clear it: the other workers would not see them, so
+    their entries go stale for at most ``LOCAL_TIMEOUT`` seconds rather
+    than ``TIMEOUT``.
+    """
+
+    key_prefix = "accounts:user-permissions:v1"
+    generation_key = "accounts:user-permissions:generation"
+
+    def __init__(self):
+        config = getattr(settings, "USER_PERMISSION_CACHE", {})
+        self.cache_alias = config.get("CACHE_ALIAS", "default")
+        self.timeout = config.get("TIMEOUT", 300)
+        self.local = LocalLRUCache(
+            maxsize=config.get("LOCAL_MAXSIZE", 1024),
+            timeout=config.get("LOCAL_TIMEOUT", 5),
+        )
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        """
+        The shared tier, or None when the cache is process-local.
+        """
+        cache = caches[self.cache_alias]
+        return None if is_process_local(cache) else cache
+
+    def generation(self, shared):
+        return get_generation(shared, self.generation_key) if shared else 0
+
+    def make_key(self, user_id, generation):
+        return f"{self.key_prefix}:{generation}:{user_id}"
+
+    def get(self, user):
+        """
+        Args:
+            user (User): An active user.
+
+        Returns:
+            frozenset: The user's permissions as ``"app_label.codename"``.
+        """
+        shared = self.shared
+        key = self.make_key(user.pk, self.generation(shared))
+        permissions = self.local.get(key)
+        if permissions is not None:
+            self._count("local_hits")
+            return permissions
+
+        permissions = shared.get(key) if shared is not None else None
+        if permissions is not None:
+            self._count("shared_hits")
+        else:
+            self._count("misses")
+            permissions = self._load(user.pk)
+            if shared is not None:
+                shared.set(key, permissions, self.timeout)
+        self.local.set(key, permissions)
+        return permissions
+
+    def invalidate(self, *user_ids):
+        """
+        Drop the entries of the given users, again once the surrounding
+        transaction commits so a concurrent request cannot re-cache the
+        pre-commit permissions.
+        """
+        if not user_ids:
+            return
+        generation = self.generation(self.shared)
+        keys = [self.make_key(user_id, generation) for user_id in user_ids]
+
+        def delete():
+            for key in keys:
+                self.local.delete(key)
+            shared = self.shared
+            if shared is not None:
+                shared.delete_many(keys)
+
+        delete()
+        transaction.on_commit(delete)
+
+    def invalidate_all(self):
+        """
+        Retire every entry, again once the current transaction commits.
+        """
+
+        def bump():
+            shared = self.shared
+            if shared is not None:
+                bump_generation(shared, self.generation_key)
+            else:
+                self.local.clear()
+
+        bump()
+        transaction.on_commit(bump)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters for this process.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _load(self, user_id):
+        rows = (
+            Permission.objects.filter(Q(user=user_id) | Q(group__user=user_id))
+            .values_list("content_type__app_label", "codename")
+            .distinct()
+        )
+        return frozenset(f"{app_label}.{codename}" for app_label, codename in rows)
+
+
+user_permission_cache = UserPermissionCache()
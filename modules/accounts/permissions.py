@@ -1,6 +1,16 @@
+from django.contrib.auth import get_permission_codename
 from modules.accounts.models import RoleChoices
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
+# Model permission needed for each unsafe method by users without the
+# SUPERUSER role.
+METHOD_ACTIONS = {
+    "POST": "add",
+    "PUT": "change",
+    "PATCH": "change",
+    "DELETE": "delete",
+}
+
 
 class IsSuperUser(BasePermission):
     """
@@ -27,14 +37,45 @@ class IsSuperUser(BasePermission):
         """
         Check object-specific permissions.
 
+        Reads are allowed to everyone; writes need the SUPERUSER role or
+        the matching model permission, e.g. ``accounts.change_user`` for
+        PATCH, which is answered from the permission cache.
+
         Returns:
             bool: True if the user has permission, False otherwise.
         """
-        if (
-            request.user.role == RoleChoices.SUPERUSER
-            and request.user.is_authenticated,
-        ):
+        user = request.user
+        if request.method in SAFE_METHODS or user.role == RoleChoices.SUPERUSER:
             return True
-        if request.method in SAFE_METHODS:
-            return True
-        return False
+
+        action = METHOD_ACTIONS.get(request.method)
+        if action is None:
+            return False
+        opts = obj._meta
+        return user.has_perm(
+            f"{opts.app_label}.{get_permission_codename(action, opts)}"
+        )
+
+
+class IsStaffOrHasModelPermission(BasePermission):
+    """
+    Allow staff users, and users holding ``permission``.
+
+    For bulk actions that bypass the per-object checks of ``IsSuperUser``.
+    """
+
+    permission = None
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user.is_authenticated and (user.is_staff or user.has_perm(self.permission))
+        )
+
+
+class CanImportUsers(IsStaffOrHasModelPermission):
+    permission = "accounts.add_user"
+
+
+class CanExportUsers(IsStaffOrHasModelPermission):
+    permission = "accounts.view_user"
@@ -0,0 +1,148 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from modules.accounts.models import MaintenanceCheckpoint, UserTombstone
+
+TOMBSTONE_CHECKPOINT = "prune_user_tombstones"
+
+
+def prune_in_batches(
+    name,
+    queryset,
+    delete_batch,
+    batch_size=1000,
+    sleep=0.1,
+    max_batches=None,
+):
+    """
+    Delete the rows of ``queryset`` in short transactions of at most
+    ``batch_size`` rows, walking the primary key upwards.
+
+    The last deleted primary key is stored in a ``MaintenanceCheckpoint``
+    after every batch, so an interrupted run resumes where it stopped. The
+    checkpoint is reset once the end of the table is reached.
+
+    Args:
+        name (str): Checkpoint name, unique per job.
+        queryset (QuerySet): Rows to delete. Must not be sliced or ordered.
+        delete_batch (callable): Called with a list of primary keys inside a
+        transaction; returns the number of deleted rows.
+        batch_size (int): Maximum rows per transaction.
+        sleep (float): Seconds to pause between batches.
+        max_batches (int, optional): Stop after this many batches.
+
+    Returns:
+        dict: ``batches`` and ``deleted`` counts and whether the run
+        ``finished``.
+    """
+    checkpoint, _ = MaintenanceCheckpoint.objects.get_or_create(name=name)
+    result = {"batches": 0, "deleted": 0, "finished": False}
+
+    while max_batches is None or result["batches"] < max_batches:
+        pks = list(
+            queryset.filter(pk__gt=checkpoint.position)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            checkpoint.position = 0
+            checkpoint.save(update_fields=["position", "updated_at"])
+            result["finished"] = True
+            break
+
+        with transaction.atomic():
+            result["deleted"] += delete_batch(pks)
+            checkpoint.position = pks[-1]
+            checkpoint.save(update_fields=["position", "updated_at"])
+        result["batches"] += 1
+
+        if sleep:
+            time.sleep(sleep)
+
+    return result
+
+
+def _delete_outstanding_tokens(pks):
+    blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=pks).delete()
+    outstanding, _ = OutstandingToken.objects.filter(pk__in=pks).delete()
+    return blacklisted + outstanding
+
+
+def prune_expired_tokens(batch_size=None, sleep=None, max_batches=None):
+    """
+    Delete expired outstanding tokens together with their blacklist
+    entries. Expired tokens fail validation before the blacklist is
+    consulted, so neither row is needed any more.
+
+    Safe to schedule: each call continues from the last checkpoint and
+    holds row locks for a single batch at a time.
+
+    Returns:
+        dict: See ``prune_in_batches``.
+    """
+    config = getattr(settings, "TOKEN_PRUNING", {})
+    return prune_in_batches(
+        "prune_expired_tokens",
+        OutstandingToken.objects.filter(expires_at__lt=timezone.now()),
+        _delete_outstanding_tokens,
+        batch_size=batch_size or config.get("BATCH_SIZE", 1000),
+        sleep=config.get("SLEEP", 0.1) if sleep is None else sleep,
+        max_batches=max_batches,
+    )
+
+
+def _delete_tombstones(pks):
+    deleted, _ = UserTombstone.objects.filter(pk__in=pks).delete()
+    return deleted
+
+
+def prune_user_tombstones(batch_size=None, sleep=None, max_batches=None):
+    """
+    Delete tombstones of users deleted more than
+    ``USER_CHANGES['TOMBSTONE_RETENTION']`` days ago.
+
+    The cutoff is recorded as the checkpoint's ``pruned_until`` before the
+    first row goes, and never moves back; the change feed rejects cursors
+    older than it, see ``tombstones_pruned_until``.
+
+    Returns:
+        dict: See ``prune_in_batches``.
+    """
+    config = getattr(settings, "USER_CHANGES", {})
+    cutoff = timezone.now() - timedelta(days=config.get("TOMBSTONE_RETENTION", 30))
+    checkpoint, _ = MaintenanceCheckpoint.objects.get_or_create(
+        name=TOMBSTONE_CHECKPOINT
+    )
+    MaintenanceCheckpoint.objects.filter(pk=checkpoint.pk).filter(
+        Q(pruned_until__isnull=True) | Q(pruned_until__lt=cutoff)
+    ).update(pruned_until=cutoff)
+    return prune_in_batches(
+        TOMBSTONE_CHECKPOINT,
+        UserTombstone.objects.filter(deleted_at__lt=cutoff),
+        _delete_tombstones,
+        batch_size=batch_size or config.get("PRUNE_BATCH_SIZE", 1000),
+        sleep=config.get("PRUNE_SLEEP", 0.1) if sleep is None else sleep,
+        max_batches=max_batches,
+    )
+
+
+def tombstones_pruned_until():
+    """
+    Returns:
+        datetime: Tombstones of users deleted before this may be pruned, or
+        None if none were.
+    """
+    return (
+        MaintenanceCheckpoint.objects.filter(name=TOMBSTONE_CHECKPOINT)
+        .values_list("pruned_until", flat=True)
+        .first()
+    )
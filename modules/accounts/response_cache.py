@@ -0,0 +1,151 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from modules.utils.cache import bump_generation, get_generation, is_process_local
+
+
+class ResponseCache:
+    """
+    Shared cache of rendered ``GET`` responses of the users API.
+
+    Every key embeds a generation counter that is bumped once a change to
+    ``User`` commits, so a single increment retires every cached response
+    at once. Concurrent misses on the same key are coalesced: one request
+    renders the response while the others wait for it to appear in the
+    cache, for at most ``WAIT_TIMEOUT`` seconds.
+
+    Responses are only cached while ``CACHE_ALIAS`` is shared between
+    processes, see ``active``: a bump in a process-local cache would leave
+    the other workers serving stale responses.
+    """
+
+    key_prefix = "accounts:user-response:v1"
+    generation_key = "accounts:user-response:generation"
+    # Response headers stored with the body.
+    cached_headers = ("ETag", "Last-Modified", "Vary")
+
+    def __init__(self):
+        config = getattr(settings, "USER_RESPONSE_CACHE", {})
+        self.enabled = config.get("ENABLED", True)
+        self.cache_alias = config.get("CACHE_ALIAS", "default")
+        self.timeout = config.get("TIMEOUT", 60)
+        self.lock_timeout = config.get("LOCK_TIMEOUT", 10)
+        self.wait_timeout = config.get("WAIT_TIMEOUT", 2)
+        self.poll_interval = config.get("POLL_INTERVAL", 0.02)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    @property
+    def active(self):
+        """
+        Whether responses are cached: the cache is enabled and every worker
+        sees its generation counter.
+        """
+        return self.enabled and not is_process_local(self.shared)
+
+    def make_key(self, *parts):
+        digest = hashlib.blake2b(
+            "\0".join(map(str, parts)).encode(), digest_size=16
+        ).hexdigest()
+        generation = get_generation(self.shared, self.generation_key)
+        return f"{self.key_prefix}:{generation}:{digest}"
+
+    def get_or_render(self, key, render):
+        """
+        Return the cached response stored under ``key``, rendering and
+        caching it on a miss.
+
+        Args:
+            key (str): Key from ``make_key``.
+            render (callable): Returns the rendered response. Only ``200``
+            responses are cached.
+
+        Returns:
+            tuple: The response and whether it came from the cache.
+        """
+        entry = self.shared.get(key)
+        if entry is not None:
+            self._count("hits")
+            return self._build(entry), True
+
+        lock_key = f"{key}:lock"
+        if not self.shared.add(lock_key, 1, self.lock_timeout):
+            entry = self._wait_for(key)
+            if entry is not None:
+                self._count("coalesced")
+                return self._build(entry), True
+
+        self._count("misses")
+        try:
+            response = render()
+            if response.status_code == 200:
+                self.shared.set(key, self._entry(response), self.timeout)
+        finally:
+            self.shared.delete(lock_key)
+        return response, False
+
+    def invalidate(self):
+        """
+        Retire every cached response once the current transaction commits.
+        """
+        transaction.on_commit(lambda: bump_generation(self.shared, self.generation_key))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, coalesced and miss counters for this process and the
+            resulting hit ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats["hits"] + stats["coalesced"]
+        total = served + stats["misses"]
+        stats["hit_ratio"] = served / total if total else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"hits": 0, "coalesced": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.shared.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _entry(self, response):
+        return {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "headers": {
+                name: response[name]
+                for name in self.cached_headers
+                if response.has_header(name)
+            },
+        }
+
+    def _build(self, entry):
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        for name, value in entry["headers"].items():
+            response[name] = value
+        return response
+
+
+user_response_cache = ResponseCache()
@@ -1,8 +1,18 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save, pre_save
+from django.contrib.auth.models import Group, Permission, update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
-from modules.accounts.models import Constants, RoleChoices, SuperUser, TrackingModel
+from modules.accounts.models import UserTombstone, get_profile_model
+from modules.accounts.blacklist import blacklist_filter
+from modules.accounts.last_login import last_login_recorder
+from modules.accounts.permission_cache import user_permission_cache
+from modules.accounts.response_cache import user_response_cache
+from modules.accounts.user_cache import user_snapshot_cache
 
 User = get_user_model()
 
@@ -14,30 +24,108 @@ def create_user_profiles(sender, instance, created, **kwargs):
     when a new user is created.
     """
     if created:
-        profile_models = {
-            RoleChoices.SUPERUSER: SuperUser,
-        }
+        profile_model = get_profile_model(instance)
 
-        if instance.is_superuser or instance.is_staff:
-            profile_model = SuperUser
-        else:
-            profile_model = profile_models.get(instance.role)
-
-        # Create the profile
-        profile_model.objects.get_or_create(user=instance)
+        # A new user cannot have a profile yet, so a plain insert suffices
         if profile_model:
-            profile_model.objects.get_or_create(user=instance)
+            profile_model.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, created=False, **kwargs):
+    """
+    Drop the cached snapshot of a user that was saved or deleted.
+    """
+    if not created:
+        user_snapshot_cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def record_user_tombstone(sender, instance, **kwargs):
+    """
+    Leave a tombstone for the users change feed.
+    """
+    UserTombstone.objects.create(user_id=instance.pk)
 
 
-@receiver(pre_save)
-def set_updated_flag(sender, instance, **kwargs):
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_snapshot_on_m2m(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
     """
-    Signal handler to set the updated_flag field before saving the object.
+    Drop the cached snapshots and permission sets of users whose groups or
+    permissions changed and touch their ``updated_at``.
 
     Args:
-        sender (Type): The model class.
-        instance: The instance of the model.
-        **kwargs: Additional keyword arguments passed to the function.
+        instance: The user, or the group/permission when the relation is
+        changed from the reverse side.
+        action (str): The m2m_changed action.
+        reverse (bool): True when ``instance`` is not a user.
+        pk_set (set): Primary keys of the related objects, None on clear.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if not reverse:
+        user_ids = [instance.pk]
+    elif pk_set:
+        user_ids = list(pk_set)
+    elif action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    else:
+        return
+
+    user_snapshot_cache.invalidate(*user_ids)
+    user_permission_cache.invalidate(*user_ids)
+    # groups and user_permissions are part of the API representation, so
+    # move updated_at forward for conditional GETs.
+    User.objects.filter(pk__in=user_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_permission_sets(sender, action=None, **kwargs):
+    """
+    Retire every cached permission set once a group's permissions change
+    or a group or permission is deleted, since any number of users can be
+    affected.
+    """
+    if action in (None, "post_add", "post_remove", "post_clear"):
+        user_permission_cache.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_responses(sender, action=None, **kwargs):
+    """
+    Retire the cached users API responses once a user change commits.
+    """
+    if action in (None, "post_add", "post_remove", "post_clear"):
+        user_response_cache.invalidate()
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def notify_blacklist_filters(sender, instance, created, **kwargs):
+    """
+    Make every worker's blacklist filter sync once the new row is visible.
+    """
+    if created:
+        transaction.on_commit(blacklist_filter.bump_generation)
+
+
+# Replace django.contrib.auth's synchronous last_login write for session
+# logins with the buffered recorder used by the API.
+user_logged_in.disconnect(update_last_login, dispatch_uid="update_last_login")
+
+
+@receiver(user_logged_in, dispatch_uid="record_last_login")
+def record_last_login(sender, user, **kwargs):
+    """
+    Queue the user's last_login timestamp for the next bulk flush.
     """
-    if isinstance(instance, TrackingModel) and not instance._state.adding:
-        instance.updated_flag = Constants.YES
+    last_login_recorder.record(user)
@@ -0,0 +1,91 @@
+import json
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from modules.accounts.importing import UserImporter, decode_lines, read_csv, read_ndjson
+from modules.accounts.tokens import account_activation_token
+from modules.utils.tasks import task
+
+User = get_user_model()
+
+
+@task
+def deliver_activation_mail(user_id, domain):
+    """
+    Render and send the activation email of a user.
+
+    Args:
+        user_id (int): Primary key of the user to activate.
+        domain (str): Domain of the site the activation link points to.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or user.is_active:
+        return
+
+    message = render_to_string(
+        "accounts/activate_email.html",
+        {
+            "user": user,
+            "domain": domain,
+            "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": account_activation_token.make_token(user),
+        },
+    )
+    email = EmailMessage("Please Activate Your Account.", message, to=[user.email])
+    email.send()
+
+
+@task
+def deliver_password_reset_mail(email, domain, use_https=False, **options):
+    """
+    Send password reset emails to the active accounts of ``email``, as
+    ``PasswordResetView`` would.
+
+    Args:
+        email (str): The address entered on the reset form.
+        domain (str): Domain of the site the reset link points to.
+        use_https (bool): Whether the link uses https.
+        **options: Template names and other arguments of
+        ``PasswordResetForm.save``.
+    """
+    form = PasswordResetForm({"email": email})
+    if form.is_valid():
+        form.save(domain_override=domain, use_https=use_https, **options)
+
+
+# Retrying would report the rows created by the failed run as duplicates.
+@task(max_attempts=1, atomic=False)
+def import_users_file(name, input_format, results_name, allowed_roles=None):
+    """
+    Import an upload saved by ``POST /api/users/import/``.
+
+    Not atomic: the importer commits chunk by chunk. The NDJSON results are
+    saved as ``results_name`` in the default storage and the upload is
+    deleted.
+
+    Args:
+        name (str): The upload in the default storage.
+        input_format (str): ``csv`` or ``ndjson``.
+        results_name (str): Where to save the results.
+        allowed_roles (list, optional): Roles the rows may ask for.
+
+    Returns:
+        dict: The import summary.
+    """
+    reader = read_csv if input_format == "csv" else read_ndjson
+    importer = UserImporter(allowed_roles=allowed_roles)
+    with default_storage.open(name, "rb") as upload, tempfile.TemporaryFile() as out:
+        for result in importer.run(reader(decode_lines(upload))):
+            out.write(json.dumps(result).encode() + b"\n")
+        out.seek(0)
+        default_storage.save(results_name, File(out, name=results_name))
+    default_storage.delete(name)
+    return result["summary"]
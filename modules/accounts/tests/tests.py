@@ -1,3 +1,1420 @@
-from django.test import TestCase
+import json
+import os
+import re
+import smtplib
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import RSAAlgorithm
+from django.contrib.auth.models import Group, Permission
+from django.contrib.messages import get_messages
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.state import token_backend as legacy_backend
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from modules.accounts.blacklist import FilteredRefreshToken, blacklist_filter
+from modules.accounts.changes import encode_cursor, user_change_feed
+from modules.accounts.google import GoogleTokenError, GoogleTokenVerifier
+from modules.accounts.keyring import (
+    KeyRing,
+    KeyRingAccessToken,
+    key_ring_backend,
+    load_key,
+)
+from modules.accounts.importing import UserImporter
+from modules.accounts.last_login import LastLoginRecorder
+from modules.accounts.models import (
+    Constants,
+    MaintenanceCheckpoint,
+    RoleChoices,
+    SuperUser,
+    User,
+)
+from modules.accounts.permission_cache import user_permission_cache
+from modules.accounts.pruning import prune_expired_tokens, prune_user_tombstones
+from modules.accounts.response_cache import user_response_cache
+from modules.accounts.send_mails import send_activation_mail
+from modules.accounts.tasks import import_users_file
+from modules.accounts.tokens import account_activation_token
+from modules.accounts.user_cache import user_snapshot_cache
+from modules.utils.mailer.backends import QueuedEmailBackend
+from modules.utils.mailer.delivery import MailDelivery
+from modules.utils.mailer.models import Mail, MailStatus
+from modules.utils.sessions import (
+    SessionStore,
+    SessionWriter,
+    prune_expired_sessions,
+    session_writer,
+)
+from modules.utils.tasks import task
+from modules.utils.tasks.models import Task, TaskStatus
+from modules.utils.tasks.worker import Worker
+
+# A cache all processes can see, for the features that need one.
+SHARED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "accounts-tests-cache"),
+    }
+}
+
+
+class RegisterViewSetTests(TestCase):
+    url = "/api/register/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {
+            "email": "jane@example.com",
+            "phone_no": "0712345678",
+            "name": "Jane Doe",
+            "password": "c0rrect-H0rse",
+            "password_confirmation": "c0rrect-H0rse",
+        }
+
+    def register(self, **overrides):
+        return self.client.post(self.url, {**self.payload, **overrides})
+
+    def test_signup_runs_three_statements(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.register()
+
+        self.assertEqual(response.status_code, 201, response.content)
+        # Savepoints come from the test case wrapping ATOMIC_REQUESTS.
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 3, statements)
+
+        user = User.objects.get(email=self.payload["email"])
+        self.assertEqual(user.role, RoleChoices.SUPERUSER)
+        self.assertTrue(SuperUser.objects.filter(user=user).exists())
+
+    def test_duplicate_email(self):
+        self.register()
+        response = self.register(phone_no="0700000000")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"error": ["User with this email already exists."]},
+        )
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_duplicate_phone_number(self):
+        self.register()
+        response = self.register(email="john@example.com")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"error": "User with this phone number already exists."},
+        )
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_duplicate_email_mentioning_phone_no(self):
+        self.register(email="phone_no@example.com")
+        response = self.register(email="phone_no@example.com", phone_no="0700000000")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"error": ["User with this email already exists."]},
+        )
+
+
+class UserViewSetTests(TestCase):
+    url = "/api/users/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="c0rrect-H0rse", phone_no="0700000001"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_sparse_fieldset_selects_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {"fields": "id,email,name"})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.admin.pk, "email": self.admin.email, "name": ""}],
+        )
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        # The conditional GET validators, then the page itself.
+        self.assertEqual(len(statements), 2, statements)
+        self.assertNotIn("password", statements[1])
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url, {"fields": "id,password"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields_and_exclude_must_leave_a_field(self):
+        for query in (
+            {"fields": "id", "exclude": "id"},
+            {"fields": "id,email", "exclude": "email"},
+            {"fields": ""},
+        ):
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 400, query)
+
+        response = self.client.get(self.url, {"fields": "id,email", "exclude": "name"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_malformed_and_overflowing_ids_are_not_found(self):
+        for pk in ("abc", "9" * 30):
+            response = self.client.get(f"{self.url}{pk}/")
+            self.assertEqual(response.status_code, 404, pk)
+
+    def test_unchanged_user_is_not_modified(self):
+        url = f"{self.url}{self.admin.pk}/"
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.groups.add(Group.objects.create(name="support"))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @mock.patch.object(user_response_cache, "enabled", False)
+    def test_page_etag_only_reads_the_page(self):
+        john = User.objects.create_user("john@example.com", role="")
+        url = f"{self.url}?page_size=1"
+        with CaptureQueriesContext(connection) as context:
+            etag = self.client.get(url)["ETag"]
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+            self.assertNotIn("MAX(", query["sql"])
+
+        # The admin is on the next page.
+        self.admin.name = "Admin"
+        self.admin.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        john.name = "John"
+        john.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["name"], "John")
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_list_is_served_from_cache(self):
+        cache.clear()
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(statements, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                email="john@example.com", password="c0rrect-H0rse", role=""
+            )
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_process_local_cache_is_not_used(self):
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(context.captured_queries)
+
+    def test_warm_authentication_runs_no_query(self):
+        url = f"{self.url}{self.admin.pk}/"
+        token = FilteredRefreshToken.for_user(self.admin).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        client.get(url)
+        # Compare full handling rather than cached responses.
+        patcher = mock.patch.object(user_response_cache, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user_snapshot_cache.reset_stats()
+        with CaptureQueriesContext(connection) as authenticated:
+            response = client.get(url, {"fields": "id"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(user_snapshot_cache.stats()["misses"], 0)
+
+        # The same request without authentication queries.
+        with CaptureQueriesContext(connection) as forced:
+            self.client.get(url, {"fields": "id"})
+        self.assertEqual(
+            [
+                q["sql"]
+                for q in authenticated.captured_queries
+                if "SAVEPOINT" not in q["sql"]
+            ],
+            [q["sql"] for q in forced.captured_queries if "SAVEPOINT" not in q["sql"]],
+        )
+
+    def test_snapshot_matches_the_user(self):
+        user = user_snapshot_cache.get(self.admin.pk)
+
+        self.assertEqual(
+            (user.role, user.is_active, user.is_staff, user.is_superuser),
+            (RoleChoices.SUPERUSER, True, True, True),
+        )
+        # Not kept in the process-local default cache.
+        self.assertIsNone(user_snapshot_cache.shared)
+        self.assertIsNone(cache.get(user_snapshot_cache.make_key(self.admin.pk)))
+
+    def test_write_permission_is_cached(self):
+        user_permission_cache.local.clear()
+        john = User.objects.create_user(
+            email="john@example.com", password="c0rrect-H0rse", role="", is_active=True
+        )
+        support = Group.objects.create(name="support")
+        john.groups.add(support)
+        self.client.force_authenticate(john)
+        url = f"{self.url}{self.admin.pk}/"
+
+        response = self.client.patch(url, {"name": "Admin"})
+        self.assertEqual(response.status_code, 403)
+
+        support.permissions.add(Permission.objects.get(codename="change_user"))
+        response = self.client.patch(url, {"name": "Admin"})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        # A fresh instance, as on the next request.
+        john = User.objects.get(pk=john.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(john.has_perm("accounts.change_user"))
+
+        support.permissions.clear()
+        john = User.objects.get(pk=john.pk)
+        self.assertFalse(john.has_perm("accounts.change_user"))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_write_permission_is_cached_in_a_shared_cache(self):
+        cache.clear()
+        self.test_write_permission_is_cached()
+
+        # Another worker, with an empty LRU, reads the shared tier.
+        user_permission_cache.local.clear()
+        user_permission_cache.reset_stats()
+        john = User.objects.get(email="john@example.com")
+        self.assertFalse(john.has_perm("accounts.change_user"))
+        self.assertEqual(user_permission_cache.stats()["shared_hits"], 1)
+
+    def test_search_and_filters(self):
+        john = User.objects.create_user(
+            email="john@example.com", password="c0rrect-H0rse", name="John", role=""
+        )
+
+        response = self.client.get(self.url, {"search": "john", "is_staff": "false"})
+        self.assertEqual(
+            [user["id"] for user in response.json()["results"]],
+            [john.pk],
+        )
+
+        response = self.client.get(self.url, {"search": "jo"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_keyset_pages_round_trip(self):
+        ids = [self.admin.pk] + [
+            User.objects.create_user(f"user{i}@example.com", role="").pk
+            for i in range(4)
+        ]
+        ids.reverse()
+
+        pages, url = [], f"{self.url}?page_size=2&fields=id"
+        while url:
+            # The links keep the query string.
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append([user["id"] for user in response.json()["results"]])
+            url, previous = response.json()["next"], response.json()["previous"]
+        self.assertEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+
+        response = self.client.get(previous)
+        self.assertEqual([user["id"] for user in response.json()["results"]], ids[2:4])
+
+    def test_pages_are_not_counted(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertNotIn("count", response.json())
+
+        with mock.patch(
+            "modules.accounts.api.pagination.estimate_count", return_value=42
+        ) as estimate_count, CaptureQueriesContext(connection) as estimated:
+            response = self.client.get(self.url, {"count": "estimate"})
+        self.assertEqual(response.json()["count"], 42)
+        # The page and its ETag.
+        self.assertEqual(estimate_count.call_count, 2)
+
+        for query in context.captured_queries + estimated.captured_queries:
+            self.assertNotIn("COUNT(*)", query["sql"])
+
+    def export(self, export_format):
+        response = self.client.get(
+            f"{self.url}export/",
+            {"export_format": export_format, "fields": "id,email,name"},
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        john = User.objects.create_user(email="john@example.com", name="John", role="")
+
+        lines = self.export("ndjson").splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {"id": self.admin.pk, "email": self.admin.email, "name": ""},
+                {"id": john.pk, "email": john.email, "name": "John"},
+            ],
+        )
+
+    def test_export_needs_staff_or_view_user(self):
+        clerk = User.objects.create_user(
+            "clerk@example.com", role=RoleChoices.SUPERUSER, is_active=True
+        )
+        self.client.force_authenticate(clerk)
+        url = f"{self.url}export/"
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        clerk.user_permissions.add(Permission.objects.get(codename="view_user"))
+        self.client.force_authenticate(User.objects.get(pk=clerk.pk))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_export_csv_escapes_formulas(self):
+        john = User.objects.create_user(
+            email="john@example.com", name="=HYPERLINK(0)", role=""
+        )
+
+        lines = self.export("csv").splitlines()
+        self.assertEqual(
+            lines,
+            [
+                "id,name,email",
+                f"{self.admin.pk},,{self.admin.email}",
+                f"{john.pk},'=HYPERLINK(0),{john.email}",
+            ],
+        )
+
+
+class StandInGoogleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path.startswith("/certs"):
+            self.reply(200, {"keys": [self.server.jwk]}, "public, max-age=600")
+        elif self.path == "/userinfo?access_token=good":
+            self.reply(200, {"email": "jane@example.com", "name": "Jane Doe"})
+        else:
+            self.reply(401, {"error": "invalid_token"})
+
+    def reply(self, status, body, cache_control="no-store"):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoogleTokenVerifierTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = RSAAlgorithm.to_jwk(cls.private_key.public_key(), as_dict=True)
+        jwk.update({"kid": "k1", "alg": "RS256", "use": "sig"})
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInGoogleHandler)
+        cls.server.jwk = jwk
+        cls.server.hits = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        cache.clear()
+        self.server.hits.clear()
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.verifier = GoogleTokenVerifier(
+            {
+                "USERINFO_URL": f"{base_url}/userinfo",
+                "CERTS_URL": f"{base_url}/certs",
+                "CLIENT_IDS": ["client-id"],
+                "RETRIES": 0,
+            }
+        )
+
+    def id_token(self, **claims):
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": "client-id",
+            "exp": int(time.time()) + 300,
+            "email": "jane@example.com",
+            "email_verified": True,
+            **claims,
+        }
+        return jwt.encode(
+            payload, self.private_key, algorithm="RS256", headers={"kid": "k1"}
+        )
+
+    def test_access_token_is_verified_once(self):
+        for _ in range(2):
+            profile = self.verifier.verify_access_token("good")
+
+        self.assertEqual(profile["email"], "jane@example.com")
+        self.assertEqual(len(self.server.hits), 1)
+
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify_access_token("revoked")
+
+    def test_id_tokens_are_verified_locally(self):
+        for _ in range(2):
+            profile = self.verifier.verify_id_token(self.id_token())
+
+        self.assertEqual(profile["email"], "jane@example.com")
+        self.assertEqual(self.server.hits, ["/certs"])
+
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify_id_token(self.id_token(aud="someone-else"))
+
+
+class AsyncAuthViewTests(TestCase):
+    payload = {
+        "email": "jane@example.com",
+        "phone_no": "0712345678",
+        "name": "Jane Doe",
+        "password": "c0rrect-H0rse",
+        "password_confirmation": "c0rrect-H0rse",
+    }
+
+    async def post(self, path, data):
+        return await self.async_client.post(
+            f"/api/async/{path}", data, content_type="application/json"
+        )
+
+    async def test_register_login_and_rotate(self):
+        response = await self.post("register/", self.payload)
+        self.assertEqual(response.status_code, 201, response.content)
+        response = await self.post("register/", self.payload)
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.post(
+            "login/", {"email": self.payload["email"], "password": "wrong"}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = await self.post(
+            "login/",
+            {"email": self.payload["email"], "password": self.payload["password"]},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        refresh = response.json()["refresh"]
+
+        response = await self.post("auth-refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response.json()["refresh"], refresh)
+        # The rotated token was blacklisted.
+        response = await self.post("auth-refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_google_sign_in_creates_the_user(self):
+        profile = {"email": "jane@example.com", "name": "Jane Doe"}
+        with mock.patch(
+            "modules.accounts.api.async_views.google_token_verifier.averify",
+            return_value=profile,
+        ):
+            response = await self.post("google-sign-in/", {"token": "good"})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        user = await User.objects.aget(email="jane@example.com")
+        self.assertEqual(user.name, "Jane Doe")
+        self.assertFalse(user.has_usable_password())
+
+
+class ActivationTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("jane@example.com", is_active=False)
+        self.token = account_activation_token.make_token(self.user)
+
+    def activate(self, token):
+        """
+        Returns:
+            str: Level of the message the activation link left.
+        """
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        response = self.client.get(reverse("accounts:activate", args=[uid, token]))
+        self.assertRedirects(
+            response, reverse("accounts:login"), fetch_redirect_response=False
+        )
+        self.user.refresh_from_db()
+        # Unread messages of earlier requests come first.
+        return list(get_messages(response.wsgi_request))[-1].level_tag
+
+    def test_valid_token_activates_once(self):
+        self.assertTrue(account_activation_token.check_token(self.user, self.token))
+        self.assertEqual(self.activate(self.token), "success")
+        self.assertTrue(self.user.is_active)
+
+        self.assertFalse(account_activation_token.check_token(self.user, self.token))
+        self.assertEqual(self.activate(self.token), "error")
+
+    @override_settings(ACCOUNT_ACTIVATION={"TIMEOUT": 60})
+    def test_expired_token(self):
+        later = account_activation_token._now() + timedelta(seconds=61)
+        with mock.patch.object(account_activation_token, "_now", return_value=later):
+            self.assertFalse(
+                account_activation_token.check_token(self.user, self.token)
+            )
+            self.assertEqual(self.activate(self.token), "error")
+        self.assertFalse(self.user.is_active)
+
+    def test_tampered_tokens(self):
+        timestamp, signature = self.token.split("-")
+        other = User.objects.create_user("john@example.com", is_active=False)
+        for token in (
+            f"{timestamp}-{signature[::-1]}",
+            f"{int(timestamp, 36) + 1:x}-{signature}",
+            "not-a-token-at-all",
+            account_activation_token.make_token(other),
+        ):
+            self.assertFalse(
+                account_activation_token.check_token(self.user, token), token
+            )
+            self.assertEqual(self.activate(token), "error")
+        self.assertFalse(self.user.is_active)
+
+    def test_email_change_voids_the_token(self):
+        self.user.email = "janet@example.com"
+        self.user.save()
+
+        self.assertEqual(self.activate(self.token), "error")
+        self.assertFalse(self.user.is_active)
+
+    def test_unknown_or_malformed_uid(self):
+        for uid in ("bm9wZQ", "!!"):
+            response = self.client.get(
+                reverse("accounts:activate", args=[uid, self.token])
+            )
+            self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+
+@task(name="tests.flaky", max_attempts=2)
+def flaky_task():
+    raise RuntimeError("flaky")
+
+
+class TaskWorkerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_activation_mail_is_sent_by_the_worker(self):
+        user = User.objects.create_user("jane@example.com", is_active=False)
+        send_activation_mail(user, RequestFactory().get("/"))
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(Worker().drain()["succeeded"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["jane@example.com"])
+        self.assertFalse(Task.objects.exists())
+
+        link = re.search(r"/activate/\S+", mail.outbox[0].body).group()
+        self.client.get(link)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        # Activation spends the token.
+        token = link.split("/")[3]
+        self.assertFalse(account_activation_token.check_token(user, token))
+
+    def test_failed_task_is_retried_then_kept(self):
+        flaky_task.enqueue()
+        worker = Worker()
+
+        with self.assertLogs("modules.utils.tasks.worker", "WARNING"):
+            worker.drain()
+        queued = Task.objects.get()
+        self.assertEqual(queued.status, TaskStatus.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn("RuntimeError: flaky", queued.last_error)
+
+        Task.objects.update(run_at=queued.created_at)
+        with self.assertLogs("modules.utils.tasks.worker", "ERROR"):
+            stats = worker.drain()
+        self.assertEqual(stats, {"succeeded": 0, "retried": 1, "failed": 1})
+        self.assertEqual(Task.objects.get().status, TaskStatus.FAILED)
+
+    def test_password_reset_is_deferred(self):
+        User.objects.create_user(
+            "jane@example.com", password="c0rrect-H0rse", is_active=True
+        )
+        for email in ("jane@example.com", "nobody@example.com", "jane@example.com"):
+            response = self.client.post("/password_reset/", {"email": email})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        # The repeated request for jane was throttled.
+        self.assertEqual(Task.objects.count(), 2)
+
+        Worker().drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("/reset/", mail.outbox[0].body)
+
+
+class RejectingEmailBackend(LocMemEmailBackend):
+    """
+    Refuses mail to rejected@example.com.
+    """
+
+    def send_messages(self, messages):
+        for message in messages:
+            if "rejected@example.com" in message.to:
+                raise smtplib.SMTPRecipientsRefused({"rejected@example.com": ()})
+        return super().send_messages(messages)
+
+
+class MailDeliveryTests(TestCase):
+    def test_queued_mail_is_delivered_over_one_connection(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sent = QueuedEmailBackend().send_messages(
+                [
+                    EmailMessage("Hi", "Hello", to=[f"user{i}@example.com"])
+                    for i in range(3)
+                ]
+            )
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Task.objects.filter(name="mailer.deliver_queued_mail"))
+
+        delivery = MailDelivery(
+            {"BACKEND": "django.core.mail.backends.locmem.EmailBackend"}
+        )
+        self.assertEqual(delivery.deliver_pending()["sent"], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[2].to, ["user2@example.com"])
+        self.assertEqual(
+            set(Mail.objects.values_list("status", flat=True)), {MailStatus.SENT}
+        )
+
+    def test_waiting_delivery_task_is_reused(self):
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                QueuedEmailBackend().send_messages(
+                    [EmailMessage("Hi", "Hello", to=[f"user{i}@example.com"])]
+                )
+
+        self.assertEqual(
+            Task.objects.filter(name="mailer.deliver_queued_mail").count(), 1
+        )
+
+    def test_each_mail_is_marked_sent_as_it_goes(self):
+        QueuedEmailBackend().send_messages(
+            [EmailMessage("Hi", "Hello", to=["jane@example.com"]) for _ in range(2)]
+        )
+        delivery = MailDelivery(
+            {"BACKEND": "django.core.mail.backends.locmem.EmailBackend"}
+        )
+        send = delivery._send
+
+        def crash_on_second(mail_row):
+            if mail.outbox:
+                raise SystemExit
+            return send(mail_row)
+
+        with mock.patch.object(delivery, "_send", side_effect=crash_on_second):
+            with self.assertRaises(SystemExit):
+                delivery.deliver_pending()
+
+        self.assertEqual(
+            list(Mail.objects.order_by("pk").values_list("status", flat=True)),
+            [MailStatus.SENT, MailStatus.SENDING],
+        )
+
+    def test_partial_failure_keeps_sent_mail_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QueuedEmailBackend().send_messages(
+                [
+                    EmailMessage("Hi", "Hello", to=["jane@example.com"]),
+                    EmailMessage("Hi", "Hello", to=["rejected@example.com"]),
+                ]
+            )
+        delivery = MailDelivery(
+            {
+                "BACKEND": f"{__name__}.RejectingEmailBackend",
+                "MAX_ATTEMPTS": 2,
+            }
+        )
+
+        with mock.patch("modules.utils.mailer.tasks.mail_delivery", delivery):
+            self.assertEqual(Worker().drain()["retried"], 1)
+            Task.objects.update(run_at=timezone.now())
+            self.assertEqual(Worker().drain()["succeeded"], 1)
+
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["jane@example.com"]]
+        )
+        self.assertEqual(
+            list(Mail.objects.order_by("pk").values_list("status", "attempts")),
+            [(MailStatus.SENT, 1), (MailStatus.FAILED, 2)],
+        )
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(session_writer, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_pages_read_the_session_from_the_cache(self):
+        cache.clear()
+        user = User.objects.create_user("jane@example.com", is_active=True)
+        self.client.force_login(user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/home/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [q["sql"] for q in context.captured_queries if "django_session" in q["sql"]]
+        )
+
+    def test_process_local_cache_is_not_trusted(self):
+        session = SessionStore()
+        session["user"] = "jane"
+        session.save()
+        self.assertTrue(Session.objects.filter(pk=session.session_key).exists())
+
+        # Logged out by another worker, which cannot reach this cache.
+        Session.objects.filter(pk=session.session_key).delete()
+        self.assertEqual(SessionStore(session.session_key).load(), {})
+        self.assertFalse(SessionStore().exists(session.session_key))
+
+    def test_writer_skips_deleted_sessions(self):
+        writer = SessionWriter()
+        expire_date = timezone.now() + timedelta(days=1)
+        cache.set(f"{SessionStore.cache_key_prefix}kept", {})
+        writer.queue("kept", "data", expire_date)
+        writer.queue("deleted", "data", expire_date)
+
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), ["kept"]
+        )
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_logout_during_flush_is_not_undone(self):
+        cache.clear()
+        writer = SessionWriter()
+        session = SessionStore()
+        session["user"] = "jane"
+        session.create()
+        writer.queue(session.session_key, "data", timezone.now() + timedelta(days=1))
+
+        session_cache = caches[settings.SESSION_CACHE_ALIAS]
+        get_many = session_cache.get_many
+        logged_out = []
+
+        def logout_after_snapshot(keys):
+            found = get_many(keys)
+            if not logged_out:
+                # Another worker, between the cache check and the upsert.
+                SessionStore(session.session_key).delete()
+                logged_out.append(True)
+            return found
+
+        with mock.patch.object(
+            session_cache, "get_many", side_effect=logout_after_snapshot
+        ):
+            self.assertEqual(writer.flush(), 0)
+
+        self.assertFalse(Session.objects.filter(pk=session.session_key).exists())
+        self.assertEqual(SessionStore(session.session_key).load(), {})
+
+    def test_expired_sessions_are_purged_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f"expired{i}", session_data="", expire_date=past)
+            for i in range(5)
+        )
+        result = prune_expired_sessions(batch_size=2, sleep=0)
+        self.assertEqual(result, {"batches": 3, "deleted": 5, "finished": True})
+
+
+@override_settings(HOME_PAGE={"PAGE_SIZE": 2, "CHUNK_SIZE": 1})
+class HomeViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(f"user{i}@example.com", is_active=True)
+            for i in range(5)
+        ]
+        self.client.force_login(self.users[0])
+
+    def get_page(self, query=""):
+        response = self.client.get(f"/home/{query}")
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return re.findall(r"user\d@example.com", content), content
+
+    def test_keyset_pages(self):
+        emails, content = self.get_page()
+        self.assertEqual(emails, ["user4@example.com", "user3@example.com"])
+        self.assertIn(f"?after={self.users[3].pk}", content)
+        self.assertNotIn("?before=", content)
+
+        emails, content = self.get_page(f"?after={self.users[1].pk}")
+        self.assertEqual(emails, ["user0@example.com"])
+        self.assertIn(f"?before={self.users[0].pk}", content)
+        self.assertNotIn("?after=", content)
+
+        emails, content = self.get_page(f"?before={self.users[0].pk}")
+        self.assertEqual(emails, ["user2@example.com", "user1@example.com"])
+        self.assertIn(f"?before={self.users[2].pk}", content)
+        self.assertIn(f"?after={self.users[1].pk}", content)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_unchanged_page_is_served_from_cache(self):
+        cache.clear()
+        self.get_page()
+
+        with CaptureQueriesContext(connection) as context:
+            emails, _ = self.get_page()
+        self.assertEqual(len(emails), 2)
+        self.assertFalse(
+            [q["sql"] for q in context.captured_queries if "ORDER BY" in q["sql"]]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user("user5@example.com", is_active=True)
+        emails, _ = self.get_page()
+        self.assertEqual(emails, ["user5@example.com", "user4@example.com"])
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="c0rrect-H0rse", phone_no="0700000001"
+        )
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_profile_changelist_joins_users(self):
+        url = "/admin/accounts/superuser/"
+        queries = self.count_queries(url)
+        for i in range(3):
+            User.objects.create_user(f"user{i}@example.com", role=RoleChoices.SUPERUSER)
+
+        self.assertEqual(SuperUser.objects.count(), 4)
+        self.assertEqual(self.count_queries(url), queries)
+
+    def test_short_search_terms_are_ignored(self):
+        response = self.client.get("/admin/accounts/user/", {"q": "ad"}, follow=True)
+
+        self.assertContains(response, "admin@example.com")
+        self.assertContains(response, "are ignored")
+
+
+class TrackingQuerySetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("jane@example.com")
+        self.assertEqual(self.user.updated_flag, Constants.NO)
+
+    def assertTracked(self, before):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.updated_flag, Constants.YES)
+        self.assertGreater(user.updated_at, before)
+
+    def test_save_with_update_fields(self):
+        before = self.user.updated_at
+        self.user.name = "Jane"
+        self.user.save(update_fields=["name"])
+        self.assertTracked(before)
+
+    def test_update(self):
+        before = self.user.updated_at
+        User.objects.filter(pk=self.user.pk).update(name="Jane")
+        self.assertTracked(before)
+
+    def test_bulk_update(self):
+        before = self.user.updated_at
+        self.user.name = "Jane"
+        User.objects.bulk_update([self.user], ["name"])
+        self.assertTracked(before)
+
+
+class UserChangeFeedTests(TestCase):
+    url = "/api/users/changes/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="c0rrect-H0rse", phone_no="0700000001"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        patcher = mock.patch.multiple(user_change_feed, settle=0, poll_interval=0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, **params):
+        response = self.client.get(self.url, {**params, "fields": "id,name"})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_created_updated_and_deleted(self):
+        jane = User.objects.create_user("jane@example.com")
+        john = User.objects.create_user("john@example.com")
+
+        page = self.read(limit=2)
+        self.assertEqual(
+            [(c["action"], c["id"]) for c in page["results"]],
+            [("created", self.admin.pk), ("created", jane.pk)],
+        )
+        self.assertTrue(page["has_more"])
+        page = self.read(since=page["next"])
+        self.assertEqual([c["id"] for c in page["results"]], [john.pk])
+        self.assertFalse(page["has_more"])
+        cursor = page["next"]
+
+        jane.name = "Jane"
+        jane.save()
+        john_id = john.pk
+        john.delete()
+        page = self.read(since=cursor)
+        self.assertEqual(
+            page["results"],
+            [
+                {
+                    "action": "updated",
+                    "id": jane.pk,
+                    "user": {"id": jane.pk, "name": "Jane"},
+                },
+                {"action": "deleted", "id": john_id, "user": None},
+            ],
+        )
+
+        page = self.read(since=page["next"], wait=1)
+        self.assertEqual(page["results"], [])
+
+    def test_waits_outside_the_request_transaction(self):
+        self.assertEqual(resolve(self.url).func._non_atomic_requests, {"default"})
+        self.assertFalse(
+            getattr(resolve("/api/users/").func, "_non_atomic_requests", None)
+        )
+
+    def test_invalid_and_expired_cursors(self):
+        response = self.client.get(self.url, {"since": "nope"})
+        self.assertEqual(response.status_code, 400)
+        cursor = encode_cursor(timezone.now().replace(tzinfo=None), 1)
+        response = self.client.get(self.url, {"since": cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursors_older_than_the_prune_watermark_expire(self):
+        old = encode_cursor(timezone.now() - timedelta(days=365), 1)
+        recent = encode_cursor(timezone.now() - timedelta(days=1), 1)
+        # Nothing pruned yet, however old the cursor.
+        self.assertEqual(self.client.get(self.url, {"since": old}).status_code, 200)
+
+        prune_user_tombstones(sleep=0)
+
+        self.assertEqual(self.client.get(self.url, {"since": old}).status_code, 410)
+        self.assertEqual(self.client.get(self.url, {"since": recent}).status_code, 200)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class BlacklistFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.addCleanup(blacklist_filter.reset)
+        user = User.objects.create_user("jane@example.com", is_active=True)
+        self.token = str(FilteredRefreshToken.for_user(user))
+
+    def blacklist_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            try:
+                FilteredRefreshToken(self.token)
+            except TokenError:
+                pass
+        return [
+            q["sql"]
+            for q in context.captured_queries
+            if "token_blacklist_blacklistedtoken" in q["sql"]
+        ]
+
+    def test_unlisted_token_skips_the_blacklist_query(self):
+        blacklist_filter.sync(force=True)
+
+        self.assertEqual(self.blacklist_queries(), [])
+
+    def test_token_blacklisted_elsewhere_is_rejected(self):
+        blacklist_filter.sync(force=True)
+        # Blacklisted by another worker, which bumps the generation.
+        jti = FilteredRefreshToken(self.token)["jti"]
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=jti))
+        blacklist_filter.bump_generation()
+
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(self.token)
+
+        # Also after the filter is rebuilt from scratch.
+        blacklist_filter.reset()
+        blacklist_filter.bump_generation()
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(self.token)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_process_local_cache_bypasses_the_filter(self):
+        blacklist_filter.sync(force=True)
+
+        self.assertTrue(self.blacklist_queries())
+
+
+class TokenPruningTests(TestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(days=1)
+        self.expired = [
+            OutstandingToken.objects.create(
+                jti=f"expired{i}", token="", expires_at=past
+            ).pk
+            for i in range(5)
+        ]
+        BlacklistedToken.objects.create(token_id=self.expired[0])
+        OutstandingToken.objects.create(
+            jti="live", token="", expires_at=timezone.now() + timedelta(days=1)
+        )
+
+    def remaining(self):
+        return list(
+            OutstandingToken.objects.order_by("pk").values_list("jti", flat=True)
+        )
+
+    def test_deletes_in_batches(self):
+        result = prune_expired_tokens(batch_size=2, sleep=0)
+
+        self.assertEqual(result, {"batches": 3, "deleted": 6, "finished": True})
+        self.assertEqual(self.remaining(), ["live"])
+        checkpoint = MaintenanceCheckpoint.objects.get(name="prune_expired_tokens")
+        self.assertEqual(checkpoint.position, 0)
+
+    def test_max_batches_checkpoints_and_resumes(self):
+        result = prune_expired_tokens(batch_size=2, sleep=0, max_batches=1)
+
+        self.assertEqual(result, {"batches": 1, "deleted": 3, "finished": False})
+        checkpoint = MaintenanceCheckpoint.objects.get(name="prune_expired_tokens")
+        self.assertEqual(checkpoint.position, self.expired[1])
+
+        result = prune_expired_tokens(batch_size=2, sleep=0)
+        self.assertEqual(result, {"batches": 2, "deleted": 3, "finished": True})
+        self.assertEqual(self.remaining(), ["live"])
+
+    def test_resumes_from_a_stored_checkpoint(self):
+        MaintenanceCheckpoint.objects.create(
+            name="prune_expired_tokens", position=self.expired[2]
+        )
+
+        result = prune_expired_tokens(batch_size=10, sleep=0, max_batches=1)
+        self.assertEqual(result["deleted"], 2)
+        self.assertEqual(self.remaining(), ["expired0", "expired1", "expired2", "live"])
+
+
+class KeyRingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("jane@example.com", is_active=True)
+        self.retired_key = ed25519.Ed25519PrivateKey.generate()
+        retired_pem = self.retired_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        active_pem = ed25519.Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        key_ring = KeyRing(
+            [load_key("2024", retired_pem), load_key("2025", active_pem)]
+        )
+        patcher = mock.patch.dict(key_ring_backend.__dict__, {"key_ring": key_ring})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_signs_with_the_active_kid(self):
+        token = str(KeyRingAccessToken.for_user(self.user))
+
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "2025")
+        self.assertEqual(KeyRingAccessToken(token)["user_id"], self.user.pk)
+
+    def test_verifies_with_a_retired_kid(self):
+        payload = KeyRingAccessToken.for_user(self.user).payload
+        token = jwt.encode(
+            payload, self.retired_key, algorithm="EdDSA", headers={"kid": "2024"}
+        )
+
+        self.assertEqual(KeyRingAccessToken(token)["user_id"], self.user.pk)
+
+    def test_legacy_tokens_are_rejected_unless_accepted(self):
+        payload = KeyRingAccessToken.for_user(self.user).payload
+        token = legacy_backend.encode(payload)
+
+        with self.assertRaises(TokenError):
+            KeyRingAccessToken(token)
+        with override_settings(JWT_KEY_RING={"ACCEPT_LEGACY": True}):
+            self.assertEqual(KeyRingAccessToken(token)["user_id"], self.user.pk)
+
+    def test_jwks(self):
+        response = APIClient().get("/api/.well-known/jwks.json")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        keys = response.json()["keys"]
+        self.assertEqual([key["kid"] for key in keys], ["2024", "2025"])
+        self.assertEqual({key["alg"] for key in keys}, {"EdDSA"})
+        self.assertNotIn("d", keys[1])
+
+
+class LastLoginRecorderTests(TestCase):
+    def setUp(self):
+        self.recorder = LastLoginRecorder()
+        patcher = mock.patch.object(self.recorder, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [
+            User.objects.create_user(f"user{i}@example.com", phone_no=f"070000000{i}")
+            for i in range(3)
+        ]
+
+    def last_logins(self):
+        return list(User.objects.order_by("pk").values_list("last_login", flat=True))
+
+    def test_logins_are_buffered_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.recorder.record(self.users[0])
+        self.assertEqual(self.recorder.flush(), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.last_logins(), [None, None, None])
+        self.assertEqual(self.recorder.flush(), 1)
+        self.assertEqual(self.last_logins()[0], self.users[0].last_login)
+
+    def test_flush_writes_every_user_in_one_statement(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users:
+                self.recorder.record(user)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.recorder.flush(), 3)
+
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1, updates)
+        self.assertEqual(self.last_logins(), [user.last_login for user in self.users])
+        # Logins are not changes to the user.
+        self.assertEqual(
+            list(User.objects.order_by("pk").values_list("updated_at", "updated_flag")),
+            [(user.updated_at, user.updated_flag) for user in self.users],
+        )
+
+    def test_older_timestamp_does_not_replace_a_newer_one(self):
+        now = timezone.now()
+        User.objects.filter(pk=self.users[0].pk).update(last_login=now)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recorder.record(self.users[0], when=now - timedelta(hours=1))
+
+        self.assertEqual(self.recorder.flush(), 0)
+        self.assertEqual(self.last_logins()[0], now)
+
+
+class UserImporterTests(TestCase):
+    def setUp(self):
+        self.importer = UserImporter(chunk_size=2, hash_workers=0)
+        User.objects.create_user("taken@example.com", phone_no="0700000009")
+
+    def run_import(self, *rows):
+        results = list(self.importer.run(enumerate(rows, start=1)))
+        return results[:-1], results[-1]["summary"]
+
+    def statuses(self, results):
+        return [(result["row"], result["status"]) for result in results]
+
+    def test_creates_users(self):
+        results, summary = self.run_import(
+            {"email": "jane@example.com", "phone_no": "0700000001"},
+            {"email": "john@example.com", "name": "John"},
+            {"email": "june@example.com", "role": RoleChoices.SUPERUSER},
+        )
+
+        self.assertEqual(summary, {"created": 3, "failed": 0})
+        self.assertEqual(
+            self.statuses(results), [(1, "created"), (2, "created"), (3, "created")]
+        )
+        self.assertEqual(User.objects.get(pk=results[1]["id"]).name, "John")
+
+    def test_duplicates_within_and_across_chunks(self):
+        results, summary = self.run_import(
+            {"email": "jane@example.com", "phone_no": "0700000001"},
+            {"email": "jane@example.com"},
+            {"email": "john@example.com", "phone_no": "0700000001"},
+            {"email": "taken@example.com"},
+        )
+
+        self.assertEqual(summary, {"created": 1, "failed": 3})
+        self.assertEqual(
+            self.statuses(results),
+            [(1, "created"), (2, "error"), (3, "error"), (4, "error")],
+        )
+        self.assertIn("email", results[1]["errors"])
+        self.assertIn("phone_no", results[2]["errors"])
+        self.assertIn("email", results[3]["errors"])
+
+    def test_invalid_rows(self):
+        results, summary = self.run_import(
+            {"email": "not-an-email"},
+            None,
+            {"email": "jane@example.com"},
+        )
+
+        self.assertEqual(summary, {"created": 1, "failed": 2})
+        self.assertIn("email", results[0]["errors"])
+        self.assertIn("row", results[1]["errors"])
+        self.assertEqual(results[2]["status"], "created")
+
+    def test_concurrent_conflict_only_fails_its_row(self):
+        # Rows that passed the existence check before another writer
+        # inserted the same email.
+        pending = [
+            (1, {"email": "jane@example.com", "phone_no": None}),
+            (2, {"email": "taken@example.com", "phone_no": None}),
+        ]
+        for _, data in pending:
+            data.update(role=RoleChoices.SUPERUSER, is_active=True)
+
+        created = dict(self.importer._create(pending, None))
+
+        self.assertEqual(created[1].email, "jane@example.com")
+        self.assertIsNone(created[2])
+        self.assertTrue(User.objects.filter(email="jane@example.com").exists())
+
+
+class UserImportViewTests(TestCase):
+    url = "/api/users/import/"
+    rows = b'{"email": "jane@example.com"}\n{"email": "john@example.com"}\n'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "clerk@example.com", role=RoleChoices.SUPERUSER, is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, body=None):
+        return self.client.post(
+            self.url, body or self.rows, content_type="application/x-ndjson"
+        )
+
+    def grant_add_user(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="add_user"))
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    def test_needs_staff_or_add_user(self):
+        self.assertEqual(self.post().status_code, 403)
+
+        self.grant_add_user()
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(
+            json.loads(lines[-1]), {"summary": {"created": 2, "failed": 0}}
+        )
+
+    def test_rows_cannot_grant_roles_the_caller_lacks(self):
+        self.user.role = ""
+        self.user.save()
+        self.grant_add_user()
+
+        response = self.post(b'{"email": "jane@example.com", "role": "SUPERUSER"}\n')
+
+        result = json.loads(b"".join(response.streaming_content).splitlines()[0])
+        self.assertEqual(result["status"], "error")
+        self.assertIn("role", result["errors"])
+        self.assertFalse(User.objects.filter(email="jane@example.com").exists())
+
+    def test_large_uploads_are_imported_by_a_task(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, USER_IMPORT={"INLINE_MAX_BYTES": 10}
+        ):
+            response = self.post()
+            self.assertEqual(response.status_code, 202)
+            self.assertFalse(User.objects.filter(email="jane@example.com").exists())
+
+            queued = Task.objects.get(pk=response.json()["task"])
+            summary = import_users_file(*queued.args, **queued.kwargs)
+
+            self.assertEqual(summary, {"created": 2, "failed": 0})
+            results = os.path.join(media_root, response.json()["results"])
+            with open(results) as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+            self.assertEqual(
+                os.listdir(os.path.join(media_root, "imports")),
+                [os.path.basename(results)],
+            )
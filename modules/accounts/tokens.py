@@ -1,60 +1,67 @@
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-import six
-from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import base36_to_int
 
 
 class TokenGenerator(PasswordResetTokenGenerator):
     """
-    Custom token generator for account activation.
+    Signed account activation tokens.
+
+    A token is ``<issued at, base 36>-<HMAC>``: it carries its own issue
+    time and is checked with one HMAC of the user's state, so nothing is
+    stored. The HMAC covers ``is_active``, so a token stops working once the
+    account is activated, and the email, so changing it voids older tokens.
+    Tokens expire ``ACCOUNT_ACTIVATION['TIMEOUT']`` seconds after issue.
     """
 
-    def _make_hash_value(self, user):
+    key_salt = "modules.accounts.tokens.TokenGenerator"
+
+    @property
+    def timeout(self):
+        return getattr(settings, "ACCOUNT_ACTIVATION", {}).get("TIMEOUT", 86400)
+
+    def _make_hash_value(self, user, timestamp):
         """
-        Generate a unique hash value for the token.
+        Generate the value signed for the user.
 
         Args:
             user (User): The user object for whom the token is generated.
-            timestamp (datetime): The timestamp when the token is generated.
+            timestamp (int): The token's issue time.
 
         Returns:
             str: Unique hash value for the token.
         """
-        return (
-            six.text_type(user.pk)
-            + six.text_type(user.timestamp)
-            + six.text_type(user.is_active)
-            + six.text_type(user.email)
-        )
+        return f"{user.pk}{user.is_active}{user.email}{timestamp}"
 
-    def check_token_expiry(self, token):
+    def check_token(self, user, token):
         """
-        Check if the token has expired based on the created_at timestamp.
+        Check an activation token against the user.
 
         Args:
-            token (Token): The token object to be checked for expiration.
+            user (User): The user the token was issued to.
+            token (str): Token from ``make_token``.
 
         Returns:
-            bool: True if the token is still valid, False if it has expired.
-        """
-        # Check if the token is expired
-        expiration_time = timezone.now() - timezone.timedelta(
-            days=1
-        )  # Set expiration to 1 day
-        return token.created_at > expiration_time
-
-    def make_token(self, user):
+            bool: True if the token is authentic, unused and not expired.
         """
-        Generate a token for the specified user and set the created_at timestamp.
+        if not (user and token):
+            return False
+        try:
+            ts_b36, _ = token.split("-")
+            ts = base36_to_int(ts_b36)
+        except ValueError:
+            return False
 
-        Args:
-            user (User): The user object for whom the token is generated.
-
-        Returns:
-            Token: Token object with the created_at timestamp set.
-        """
-        # Generate a token and set the created_at timestamp
-        token = self._make_hash_value(user)
-        return token
+        # Expired tokens are rejected before any HMAC is computed.
+        if self._num_seconds(self._now()) - ts > self.timeout:
+            return False
+        return any(
+            constant_time_compare(
+                self._make_token_with_timestamp(user, ts, secret), token
+            )
+            for secret in [self.secret, *self.secret_fallbacks]
+        )
 
 
 account_activation_token = TokenGenerator()
@@ -15,6 +15,7 @@ urlpatterns = [
     # ),
     path("", views.loginView, name="login"),
     path("signup", views.SignupView.as_view(), name="signup"),
+    path("activate/<uidb64>/<token>/", views.ActivateView, name="activate"),
     path(
         "logout/",
         auth_views.LogoutView.as_view(
@@ -24,7 +25,7 @@ urlpatterns = [
     ),
     path(
         "password_reset/",
-        auth_views.PasswordResetView.as_view(
+        views.PasswordResetView.as_view(
             template_name="accounts/password_reset.html",
             success_url="/accounts/password_reset/done/",
             email_template_name="accounts/password_reset_email.html",
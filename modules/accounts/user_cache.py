@@ -0,0 +1,150 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from modules.utils.cache import LocalLRUCache, is_process_local
+
+User = get_user_model()
+
+# Columns read from ``request.user`` by the permission classes and views.
+# Anything else is loaded lazily by Django when it is first accessed.
+SNAPSHOT_FIELDS = (
+    "id",
+    "email",
+    "name",
+    "phone_no",
+    "role",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+class UserSnapshotCache:
+    """
+    Two-tier cache of user snapshots keyed by ``user_id``.
+
+    Lookups go through a process-local LRU first, then the shared Django
+    cache, and only fall back to the database on a miss in both tiers.
+    Snapshots are turned back into ``User`` instances with the remaining
+    columns deferred.
+
+    The second tier is skipped when ``CACHE_ALIAS`` is process-local: its
+    entries would outlive invalidations made by other workers, e.g. of a
+    deactivated user, for up to ``TIMEOUT`` seconds.
+    """
+
+    key_prefix = "accounts:user-snapshot:v1"
+
+    def __init__(self):
+        config = getattr(settings, "USER_SNAPSHOT_CACHE", {})
+        self.cache_alias = config.get("CACHE_ALIAS", "default")
+        self.timeout = config.get("TIMEOUT", 300)
+        self.local = LocalLRUCache(
+            maxsize=config.get("LOCAL_MAXSIZE", 1024),
+            timeout=config.get("LOCAL_TIMEOUT", 5),
+        )
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        """
+        The shared tier, or None when the cache is process-local.
+        """
+        cache = caches[self.cache_alias]
+        return None if is_process_local(cache) else cache
+
+    def make_key(self, user_id):
+        return f"{self.key_prefix}:{user_id}"
+
+    def get(self, user_id):
+        """
+        Return a ``User`` built from the cached snapshot for ``user_id``.
+
+        Args:
+            user_id: Primary key of the user.
+
+        Returns:
+            User: Instance with only ``SNAPSHOT_FIELDS`` loaded, or None if
+            the user does not exist.
+        """
+        key = self.make_key(user_id)
+        shared = self.shared
+        snapshot = self.local.get(key)
+        if snapshot is not None:
+            self._count("local_hits")
+        else:
+            snapshot = shared.get(key) if shared is not None else None
+            if snapshot is not None:
+                self._count("shared_hits")
+                self.local.set(key, snapshot)
+            else:
+                self._count("misses")
+                snapshot = self._load(user_id)
+                if snapshot is None:
+                    return None
+                if shared is not None:
+                    shared.set(key, snapshot, self.timeout)
+                self.local.set(key, snapshot)
+
+        # from_db() expects the values in the model's column order.
+        names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in snapshot
+        ]
+        return User.from_db(
+            DEFAULT_DB_ALIAS,
+            names,
+            [snapshot[name] for name in names],
+        )
+
+    def invalidate(self, *user_ids):
+        """
+        Drop the snapshots of the given users from both tiers.
+
+        The deletion is repeated once the surrounding transaction commits,
+        so a concurrent request cannot re-cache the pre-commit row.
+        """
+        keys = [self.make_key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+
+        def delete():
+            for key in keys:
+                self.local.delete(key)
+            shared = self.shared
+            if shared is not None:
+                shared.delete_many(keys)
+
+        delete()
+        transaction.on_commit(delete)
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters for this process.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _load(self, user_id):
+        return User.objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+
+
+user_snapshot_cache = UserSnapshotCache()
@@ -1,12 +1,32 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login
+from django.contrib.auth import views as auth_views
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import render, redirect, HttpResponseRedirect
 from django.contrib import messages
 from django.views.generic import CreateView
 from django.contrib.auth.decorators import login_required
+from django.contrib.sites.shortcuts import get_current_site
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from django.utils.safestring import mark_safe
 
 from modules.accounts.models import RoleChoices, User
 from modules.accounts.forms import CustomAuthenticationForm, UserSignupForm
+from modules.accounts.listing import UserPage
+from modules.accounts.response_cache import user_response_cache
+from modules.accounts.tasks import deliver_password_reset_mail
+from modules.accounts.tokens import account_activation_token
+
+# Placeholders the home page layout is split on, to stream the listing
+# between its parts.
+ROWS_MARKER = mark_safe("<!-- user rows -->")
+PAGER_MARKER = mark_safe("<!-- user pager -->")
 
 
 class SignupView(CreateView):
@@ -38,6 +58,40 @@ class SignupView(CreateView):
             return self.render_to_response(self.get_context_data(form=form))
 
 
+class PasswordResetView(auth_views.PasswordResetView):
+    """
+    Password reset request that only queues the work.
+
+    Looking up the account and rendering and sending the email happen in a
+    background task, so the response takes the same time whether or not the
+    address belongs to an account, and does not wait for SMTP. Repeated
+    requests for one address within ``PASSWORD_RESET['THROTTLE']`` seconds
+    are acknowledged without sending another email.
+    """
+
+    def form_valid(self, form):
+        config = getattr(settings, "PASSWORD_RESET", {})
+        email = form.cleaned_data["email"]
+        throttle_key = (
+            "accounts:password-reset:"
+            + hashlib.sha256(email.casefold().encode()).hexdigest()
+        )
+        if caches[config.get("CACHE_ALIAS", "default")].add(
+            throttle_key, 1, config.get("THROTTLE", 60)
+        ):
+            deliver_password_reset_mail.enqueue(
+                email,
+                domain=get_current_site(self.request).domain,
+                use_https=self.request.is_secure(),
+                subject_template_name=self.subject_template_name,
+                email_template_name=self.email_template_name,
+                html_email_template_name=self.html_email_template_name,
+                from_email=self.from_email,
+                extra_email_context=self.extra_email_context,
+            )
+        return HttpResponseRedirect(self.get_success_url())
+
+
 def loginView(request):
     """
     View for user login.
@@ -59,13 +113,83 @@ def loginView(request):
     return render(request, "accounts/login.html", {"form": form})
 
 
+def ActivateView(request, uidb64, token):
+    """
+    View for activating an account from the link in the activation email.
+    """
+    try:
+        user = User.objects.get(pk=force_str(urlsafe_base64_decode(uidb64)))
+    except (ValueError, OverflowError, User.DoesNotExist):
+        user = None
+
+    if user is not None and account_activation_token.check_token(user, token):
+        user.is_active = True
+        user.save(update_fields=["is_active", "updated_at"])
+        messages.success(request, "Your account is active, you can log in now.")
+    else:
+        messages.error(request, "The activation link is invalid or has expired.")
+    return redirect("accounts:login")
+
+
+def _cursor(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _stream_home_page(layout, page):
+    """
+    Yield the home page: the layout up to the listing, the rows as they
+    are rendered, then the pager and the rest of the layout.
+
+    The rendered rows and pager of a page are kept in the users response
+    cache, whose generation moves forward on every user change, so an
+    unchanged page is streamed without querying the database.
+    """
+    head, rest = layout.split(ROWS_MARKER, 1)
+    middle, tail = rest.split(PAGER_MARKER, 1)
+    yield head
+
+    cache = user_response_cache
+    key = cache.make_key("home", page.page_size, page.after, page.before)
+    fragments = cache.shared.get(key) if cache.active else None
+    if fragments is None:
+        rows = []
+        for chunk in page:
+            rows.append(chunk)
+            yield chunk
+        fragments = {"rows": "".join(rows), "pager": page.render_pager()}
+        if cache.active:
+            cache.shared.set(key, fragments, cache.timeout)
+    else:
+        yield fragments["rows"]
+
+    yield middle
+    yield fragments["pager"]
+    yield tail
+
+
 @login_required
 def HomeView(request):
     """
     View for the home page.
+
+    Lists ``HOME_PAGE['PAGE_SIZE']`` users per page with keyset pagination
+    (``?after=<id>`` and ``?before=<id>``) and streams the response while
+    the rows are read, so memory and page weight stay bounded however many
+    users there are.
     """
-    userQuery = User.objects.all()
-    context = {
-        "users": userQuery,
-    }
-    return render(request, "pages/home.html", context)
+    config = getattr(settings, "HOME_PAGE", {})
+    page = UserPage(
+        after=_cursor(request.GET.get("after")),
+        before=_cursor(request.GET.get("before")),
+        page_size=config.get("PAGE_SIZE", 100),
+        chunk_size=config.get("CHUNK_SIZE", 25),
+    )
+    layout = render_to_string(
+        "pages/home.html",
+        {"rows": ROWS_MARKER, "pager": PAGER_MARKER},
+        request=request,
+    )
+    return StreamingHttpResponse(_stream_home_page(layout, page))
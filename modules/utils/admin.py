@@ -0,0 +1,70 @@
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from modules.utils.queries import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes its count from the planner's statistics instead of
+    ``COUNT(*)``, see ``estimate_count``.
+
+    Page numbers are not checked against the estimate and pages are not
+    clipped to it, so an estimate that is off only changes the page links.
+    Small estimates are confirmed by a count limited to ``exact_count_limit``
+    rows: the admin lists every row unpaginated when the count is small,
+    which a stale estimate must not trigger.
+    """
+
+    exact_count_limit = 1000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate >= self.exact_count_limit:
+            return estimate
+        return self.object_list.order_by()[: self.exact_count_limit].count()
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            return super().validate_number(number)
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom : bottom + self.per_page], number, self
+        )
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for tables too large to count.
+
+    The changelist is paginated with ``EstimatedCountPaginator`` and does not
+    count the unfiltered table for the "N total" link. Search terms shorter
+    than ``min_search_term_length`` are ignored, since no trigram index can
+    serve them; list ``search_fields`` that have one.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    min_search_term_length = 3
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search_term.split()
+        usable = [term for term in terms if len(term) >= self.min_search_term_length]
+        if len(usable) < len(terms):
+            self.message_user(
+                request,
+                f"Search terms shorter than {self.min_search_term_length} "
+                "characters are ignored.",
+                messages.WARNING,
+            )
+        return super().get_search_results(request, queryset, " ".join(usable))
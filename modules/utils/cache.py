@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class LocalLRUCache:
+    """
+    Thread-safe, process-local LRU cache with a per-entry time to live.
+
+    Used as a first tier in front of the shared Django cache, so the
+    timeout should stay short: entries are not invalidated across
+    processes.
+    """
+
+    def __init__(self, maxsize=1024, timeout=5):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept before the least
+            recently used ones are evicted.
+            timeout (float): Seconds an entry stays valid. ``0`` disables
+            the cache.
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for ``key`` or ``default`` when it is
+        missing or expired.
+        """
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Store ``value`` under ``key``, evicting the least recently used
+        entries when the cache is full.
+        """
+        if self.maxsize <= 0 or self.timeout <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def is_process_local(cache):
+    """
+    Whether ``cache`` only lives in this process, so other workers see
+    neither its entries nor their invalidation.
+    """
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def get_generation(cache, key):
+    """
+    Return the generation counter stored under ``key``, creating it if
+    needed.
+
+    A missing counter is seeded from the clock rather than 0, so a counter
+    that was evicted never comes back with a value that was already used.
+    """
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(cache, key):
+    """
+    Increment the generation counter stored under ``key``.
+    """
+    get_generation(cache, key)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between get() and incr().
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class ExecutorBusy(Exception):
+    """
+    Raised when a ``BoundedExecutor`` already has ``max_pending`` jobs.
+    """
+
+
+class BoundedExecutor:
+    """
+    Thread pool for CPU-bound calls from async code, such as password
+    hashing, which releases the GIL and so runs in parallel with the event
+    loop.
+
+    At most ``max_pending`` jobs are queued or running; further calls raise
+    ``ExecutorBusy`` right away instead of growing the queue under load.
+    """
+
+    def __init__(self, max_workers, max_pending, thread_name_prefix=""):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.thread_name_prefix = thread_name_prefix
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix,
+                )
+            return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run ``func(*args, **kwargs)`` in the pool and await its result.
+
+        Raises:
+            ExecutorBusy: ``max_pending`` jobs are already waiting.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy(f"{self.max_pending} jobs are already pending")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(func, *args, **kwargs)
+            )
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
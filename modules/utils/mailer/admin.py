@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from modules.utils.mailer.models import Mail, MailStatus
+from modules.utils.mailer.tasks import deliver_queued_mail
+
+
+@admin.register(Mail)
+class MailAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "domain", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("domain",)
+    readonly_fields = ("locked_at", "last_error", "created_at", "sent_at")
+    actions = ["retry"]
+
+    @admin.action(description="Send selected mails again")
+    def retry(self, request, queryset):
+        queryset.filter(status=MailStatus.FAILED).update(
+            status=MailStatus.QUEUED, attempts=0
+        )
+        deliver_queued_mail.enqueue()
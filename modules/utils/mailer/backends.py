@@ -0,0 +1,34 @@
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DatabaseError, transaction
+
+from modules.utils.mailer.models import Mail
+from modules.utils.mailer.tasks import deliver_queued_mail
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Email backend that stores messages for a background worker to send,
+    see ``MailDelivery``. Sending costs one ``INSERT`` of the messages in
+    the caller's transaction.
+
+    Once that commits, a delivery task is queued unless one is already
+    waiting, which will then see the committed messages. A failure to
+    queue it is logged, and the messages go out with the next delivery.
+    """
+
+    def send_messages(self, email_messages):
+        mails = [
+            Mail.from_message(message)
+            for message in email_messages
+            if message.recipients()
+        ]
+        if not mails:
+            return 0
+        try:
+            Mail.objects.bulk_create(mails)
+        except DatabaseError:
+            if not self.fail_silently:
+                raise
+            return 0
+        transaction.on_commit(deliver_queued_mail.enqueue_once, robust=True)
+        return len(mails)
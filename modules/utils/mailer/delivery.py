@@ -0,0 +1,202 @@
+import logging
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from modules.utils.mailer.models import Mail, MailStatus
+
+logger = logging.getLogger(__name__)
+
+
+class MailDelivery:
+    """
+    Sends queued ``Mail`` rows through ``BACKEND``, the real email backend.
+
+    Each thread keeps its backend connection open between batches, so the
+    connect, EHLO, STARTTLS and AUTH round trips are paid once per
+    ``MAX_MESSAGES_PER_CONNECTION`` messages rather than once per message.
+    Idle connections are recycled after ``IDLE_TIMEOUT`` seconds, before
+    the server drops them. At most ``DOMAIN_CONCURRENCY`` threads of the
+    process deliver to one recipient domain at a time.
+
+    Args:
+        config (dict, optional): Overrides the ``MAILER`` setting.
+        **connection_kwargs: Passed to the backend, e.g. ``host``.
+    """
+
+    def __init__(self, config=None, **connection_kwargs):
+        if config is None:
+            config = getattr(settings, "MAILER", {})
+        self.backend = config.get(
+            "BACKEND", "django.core.mail.backends.smtp.EmailBackend"
+        )
+        self.batch_size = config.get("BATCH_SIZE", 100)
+        self.domain_concurrency = config.get("DOMAIN_CONCURRENCY", 2)
+        self.max_attempts = config.get("MAX_ATTEMPTS", 5)
+        self.idle_timeout = config.get("IDLE_TIMEOUT", 60)
+        self.max_messages_per_connection = config.get(
+            "MAX_MESSAGES_PER_CONNECTION", 1000
+        )
+        self.lock_timeout = config.get("LOCK_TIMEOUT", 600)
+        self.connection_kwargs = connection_kwargs
+        self._local = threading.local()
+        self._domain_slots = defaultdict(
+            lambda: threading.BoundedSemaphore(self.domain_concurrency)
+        )
+        self._lock = threading.Lock()
+
+    def deliver_pending(self):
+        """
+        Claim and send queued mail in batches of ``BATCH_SIZE`` until none is
+        left.
+
+        Returns:
+            dict: Sent, retried and failed counts.
+        """
+        stats = {"sent": 0, "retried": 0, "failed": 0}
+        while mails := self.claim(self.batch_size):
+            for name, count in self.deliver(mails).items():
+                stats[name] += count
+        return stats
+
+    def claim(self, limit):
+        """
+        Lock up to ``limit`` queued mails, and mails of a delivery that died
+        ``LOCK_TIMEOUT`` seconds ago, for this thread.
+
+        Returns:
+            list: The claimed ``Mail`` rows.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            mails = list(
+                Mail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=MailStatus.QUEUED)
+                    | Q(
+                        status=MailStatus.SENDING,
+                        locked_at__lt=now - timedelta(seconds=self.lock_timeout),
+                    )
+                )
+                .order_by("pk")[:limit]
+            )
+            if mails:
+                Mail.objects.filter(pk__in=[mail.pk for mail in mails]).update(
+                    status=MailStatus.SENDING,
+                    locked_at=now,
+                    attempts=F("attempts") + 1,
+                )
+        for mail in mails:
+            mail.attempts += 1
+        return mails
+
+    def deliver(self, mails):
+        """
+        Send claimed mails grouped by recipient domain over this thread's
+        connection and record each one's outcome as soon as it is known, so
+        a crash mid-group does not send the mails before it again.
+
+        Returns:
+            dict: Sent, retried and failed counts.
+        """
+        by_domain = defaultdict(list)
+        for mail in mails:
+            by_domain[mail.domain].append(mail)
+
+        stats = {"sent": 0, "retried": 0, "failed": 0}
+        for domain, group in by_domain.items():
+            with self._domain_slot(domain):
+                for mail in group:
+                    error = self._send(mail)
+                    if error is None:
+                        self._record_sent(mail)
+                        stats["sent"] += 1
+                    else:
+                        stats[self._record_failure(mail, error)] += 1
+        return stats
+
+    def close(self):
+        """
+        Close this thread's connection.
+        """
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.warning("Could not close the mail connection", exc_info=True)
+
+    def connection(self):
+        """
+        Returns:
+            BaseEmailBackend: This thread's open connection.
+        """
+        local = self._local
+        now = time.monotonic()
+        if getattr(local, "connection", None) is not None and (
+            now - local.last_used > self.idle_timeout
+            or local.messages >= self.max_messages_per_connection
+        ):
+            self.close()
+        if getattr(local, "connection", None) is None:
+            connection = get_connection(self.backend, **self.connection_kwargs)
+            connection.open()
+            local.connection = connection
+            local.messages = 0
+        local.last_used = now
+        return local.connection
+
+    def _send(self, mail):
+        # One message per call: Django's SMTP backend stops at the first
+        # failure of a batch without saying which messages went out, and
+        # the open connection already spares the per-message handshake.
+        try:
+            connection = self.connection()
+            connection.send_messages([mail.to_message()])
+        except smtplib.SMTPServerDisconnected as ex:
+            self.close()
+            return repr(ex)
+        except smtplib.SMTPException as ex:
+            # Rejected by the server, which stays usable.
+            return repr(ex)
+        except OSError as ex:
+            self.close()
+            return repr(ex)
+        except Exception as ex:
+            return repr(ex)
+        self._local.messages += 1
+        return None
+
+    def _record_sent(self, mail):
+        Mail.objects.filter(pk=mail.pk).update(
+            status=MailStatus.SENT,
+            sent_at=timezone.now(),
+            locked_at=None,
+            last_error="",
+        )
+
+    def _record_failure(self, mail, error):
+        retry = mail.attempts < self.max_attempts
+        logger.warning("Could not send mail %s: %s", mail.pk, error)
+        Mail.objects.filter(pk=mail.pk).update(
+            status=MailStatus.QUEUED if retry else MailStatus.FAILED,
+            locked_at=None,
+            last_error=error,
+        )
+        return "retried" if retry else "failed"
+
+    def _domain_slot(self, domain):
+        with self._lock:
+            return self._domain_slots[domain]
+
+
+mail_delivery = MailDelivery()
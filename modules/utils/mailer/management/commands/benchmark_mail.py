@@ -0,0 +1,91 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from modules.utils.mailer.backends import QueuedEmailBackend
+from modules.utils.mailer.delivery import MailDelivery
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sending mail with a new SMTP connection per message against "
+        "queued delivery over pooled connections, using a local aiosmtpd "
+        "sink. Queued rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--domains", type=int, default=5)
+        parser.add_argument("--port", type=int, default=8025)
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError as e:
+            raise CommandError(
+                "aiosmtpd is required, see requirements/local.txt"
+            ) from e
+
+        sink = Sink()
+        controller = Controller(sink, hostname="127.0.0.1", port=options["port"])
+        controller.start()
+        connection_kwargs = {"host": "127.0.0.1", "port": options["port"]}
+        try:
+            messages = [
+                EmailMessage(
+                    f"Benchmark {i}",
+                    "Hello",
+                    "noreply@example.com",
+                    [f"user{i}@domain{i % options['domains']}.example.com"],
+                )
+                for i in range(options["messages"])
+            ]
+
+            started = time.perf_counter()
+            for message in messages:
+                connection = get_connection(SMTP_BACKEND, **connection_kwargs)
+                connection.send_messages([message])
+            self.report("connection per message", sink, started)
+
+            sink.received = 0
+            with transaction.atomic():
+                started = time.perf_counter()
+                backend = QueuedEmailBackend()
+                for message in messages:
+                    backend.send_messages([message])
+                enqueued = time.perf_counter()
+                delivery = MailDelivery({"BACKEND": SMTP_BACKEND}, **connection_kwargs)
+                stats = delivery.deliver_pending()
+                delivery.close()
+                self.report("queued, pooled delivery", sink, enqueued)
+                self.stdout.write(
+                    f"  enqueueing took {enqueued - started:.2f}s, "
+                    f"{stats['sent']} sent, {stats['retried']} retried"
+                )
+                transaction.set_rollback(True)
+        finally:
+            controller.stop()
+
+    def report(self, label, sink, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {sink.received} messages in {elapsed:.2f}s "
+            f"({sink.received / elapsed:.0f} msg/s)"
+        )
+
+
+class Sink:
+    """
+    aiosmtpd handler that accepts and discards every message.
+    """
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
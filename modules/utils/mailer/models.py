@@ -0,0 +1,107 @@
+import base64
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class MailStatus(models.TextChoices):
+    """
+    Delivery state of an outgoing email.
+    """
+
+    QUEUED = "queued", _("Queued")
+    SENDING = "sending", _("Sending")
+    SENT = "sent", _("Sent")
+    FAILED = "failed", _("Failed")
+
+
+class Mail(models.Model):
+    """
+    An email accepted by ``QueuedEmailBackend`` and its delivery state.
+    """
+
+    message = models.JSONField(_("message"))
+    domain = models.CharField(_("recipient domain"), max_length=255)
+    status = models.CharField(
+        _("status"),
+        max_length=10,
+        choices=MailStatus.choices,
+        default=MailStatus.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    last_error = models.TextField(_("last error"), blank=True)
+    locked_at = models.DateTimeField(_("locked at"), null=True, blank=True)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("sent at"), null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "locked_at"], name="mailer_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.message['subject']} to {', '.join(self.message['to'])}"
+
+    @classmethod
+    def from_message(cls, message):
+        """
+        Args:
+            message (EmailMessage): The email to store.
+
+        Returns:
+            Mail: An unsaved row holding ``message``.
+        """
+        attachments = []
+        for attachment in message.attachments:
+            if not isinstance(attachment, tuple):
+                raise TypeError("MIMEBase attachments cannot be queued")
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                content = content.encode()
+            attachments.append([filename, base64.b64encode(content).decode(), mimetype])
+
+        recipients = message.recipients()
+        return cls(
+            domain=recipients[0].rpartition("@")[2].lower(),
+            message={
+                "subject": message.subject,
+                "body": message.body,
+                "from_email": message.from_email,
+                "to": list(message.to),
+                "cc": list(message.cc),
+                "bcc": list(message.bcc),
+                "reply_to": list(message.reply_to),
+                "headers": message.extra_headers,
+                "content_subtype": message.content_subtype,
+                "alternatives": [
+                    list(alternative)
+                    for alternative in getattr(message, "alternatives", ())
+                ],
+                "attachments": attachments,
+            },
+        )
+
+    def to_message(self, connection=None):
+        """
+        Returns:
+            EmailMultiAlternatives: The stored email, sent through
+            ``connection``.
+        """
+        data = self.message
+        message = EmailMultiAlternatives(
+            subject=data["subject"],
+            body=data["body"],
+            from_email=data["from_email"],
+            to=data["to"],
+            cc=data["cc"],
+            bcc=data["bcc"],
+            reply_to=data["reply_to"],
+            headers=data["headers"],
+            alternatives=[tuple(alternative) for alternative in data["alternatives"]],
+            connection=connection,
+        )
+        message.content_subtype = data["content_subtype"]
+        for filename, content, mimetype in data["attachments"]:
+            message.attach(filename, base64.b64decode(content), mimetype)
+        return message
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+from modules.utils.mailer.delivery import mail_delivery
+from modules.utils.tasks import task
+
+
+class MailDeliveryError(Exception):
+    """
+    Some mail could not be sent and was queued again.
+    """
+
+
+@task(
+    name="mailer.deliver_queued_mail",
+    max_attempts=getattr(settings, "MAILER", {}).get("MAX_ATTEMPTS", 5),
+    atomic=False,
+)
+def deliver_queued_mail():
+    """
+    Send all queued mail. Raises when some of it has to be retried, so the
+    task runs again after the task backoff and picks it up.
+
+    Not atomic: each mail's status and attempts are committed as soon as
+    it is sent or fails, and must survive the error, or sent mail would be
+    sent again and ``MAX_ATTEMPTS`` never reached.
+    """
+    stats = mail_delivery.deliver_pending()
+    if stats["retried"]:
+        raise MailDeliveryError(f"{stats['retried']} mails queued for a retry")
+    return stats
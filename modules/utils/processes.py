@@ -0,0 +1,10 @@
+def setup_django():
+    """
+    Process pool initializer that configures Django in workers started
+    with the ``spawn`` method. Forked workers are already set up.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
@@ -0,0 +1,266 @@
+"""
+Cache-first session engine with write-behind persistence.
+
+Set ``SESSION_ENGINE = "modules.utils.sessions"``. Sessions are read from
+``SESSION_CACHE_ALIAS`` and only fall back to ``django_session`` on a cache
+miss. Saves update the cache at once; the database row is written later in
+bulk by a background thread, so a request that changes its session costs no
+database write. Deletions, e.g. on logout, reach the database immediately
+and leave a tombstone in the cache, so a flush racing with them in another
+worker deletes the row it wrote back.
+
+Both need a cache shared by all workers: with a process-local cache a
+logout in one worker would leave the session alive in the others. Sessions
+are then read from and written to the database only, as with ``db``. Under
+uWSGI the writer thread needs ``enable-threads``.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+from modules.utils.cache import is_process_local
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    """
+    Buffers session rows in memory and upserts them in one statement from a
+    background thread, every ``FLUSH_INTERVAL`` seconds or once
+    ``MAX_PENDING`` sessions are waiting.
+
+    Sessions deleted meanwhile are skipped, as seen by their cache entry
+    and tombstone before the upsert. Tombstones read after the upsert catch
+    deletions that ran between the two; a tombstone must therefore outlive
+    a flush, and is kept ``TOMBSTONE_TIMEOUT`` seconds.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "SESSIONS", {})
+        self.enabled = config.get("WRITE_BEHIND", True)
+        self.flush_interval = config.get("FLUSH_INTERVAL", 5)
+        self.max_pending = config.get("MAX_PENDING", 1000)
+        self.tombstone_timeout = config.get("TOMBSTONE_TIMEOUT", 300)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def shared_cache(self):
+        """
+        Whether every worker sees the session cache.
+        """
+        return not is_process_local(caches[settings.SESSION_CACHE_ALIAS])
+
+    @property
+    def write_behind(self):
+        return self.enabled and self.shared_cache
+
+    def queue(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            pending = len(self._pending)
+            self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def mark_deleted(self, session_key):
+        """
+        Leave a tombstone for a session deleted by this worker, for the
+        flushes of the others.
+        """
+        caches[settings.SESSION_CACHE_ALIAS].set(
+            self._tombstone_key(session_key), True, self.tombstone_timeout
+        )
+
+    def discard(self, session_key):
+        """
+        Drop a deleted session's pending write. Waits for a running flush,
+        so the caller's ``DELETE`` comes after it.
+        """
+        with self._flush_lock, self._lock:
+            self._pending.pop(session_key, None)
+
+    def flush(self):
+        """
+        Write every buffered session still in the cache.
+
+        Returns:
+            int: Number of sessions written.
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        # Sessions deleted by another worker meanwhile are gone from the
+        # cache and must not be written back.
+        cached = caches[settings.SESSION_CACHE_ALIAS].get_many(
+            [SessionStore.cache_key_prefix + key for key in pending]
+            + [self._tombstone_key(key) for key in pending]
+        )
+        pending = {
+            key: row
+            for key, row in pending.items()
+            if SessionStore.cache_key_prefix + key in cached
+            and self._tombstone_key(key) not in cached
+        }
+        if not pending:
+            return 0
+        try:
+            Session.objects.bulk_create(
+                [
+                    Session(
+                        session_key=key,
+                        session_data=data,
+                        expire_date=expire_date,
+                    )
+                    for key, (data, expire_date) in pending.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["session_key"],
+                update_fields=["session_data", "expire_date"],
+            )
+        except Exception:
+            with self._lock:
+                for key, row in pending.items():
+                    self._pending.setdefault(key, row)
+            raise
+
+        # A deletion between the cache check and the upsert has already run
+        # its DELETE, so the upsert brought the row back.
+        tombstones = caches[settings.SESSION_CACHE_ALIAS].get_many(
+            [self._tombstone_key(key) for key in pending]
+        )
+        deleted = [key for key in pending if self._tombstone_key(key) in tombstones]
+        if deleted:
+            Session.objects.filter(session_key__in=deleted).delete()
+        return len(pending) - len(deleted)
+
+    def _tombstone_key(self, session_key):
+        return f"{SessionStore.cache_key_prefix}.deleted{session_key}"
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="session-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush sessions")
+            finally:
+                connections.close_all()
+
+    def shutdown(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not flush sessions on exit")
+
+
+session_writer = SessionWriter()
+atexit.register(session_writer.shutdown)
+
+
+def prune_expired_sessions(batch_size=None, sleep=None, max_batches=None):
+    """
+    Delete expired sessions in short transactions of at most ``batch_size``
+    rows, oldest first along the ``expire_date`` index.
+
+    Returns:
+        dict: ``batches`` and ``deleted`` counts and whether the run
+        ``finished``.
+    """
+    config = getattr(settings, "SESSIONS", {})
+    batch_size = batch_size or config.get("PURGE_BATCH_SIZE", 1000)
+    sleep = config.get("PURGE_SLEEP", 0.1) if sleep is None else sleep
+    result = {"batches": 0, "deleted": 0, "finished": False}
+    now = timezone.now()
+
+    while max_batches is None or result["batches"] < max_batches:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .order_by("expire_date")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not keys:
+            result["finished"] = True
+            break
+        deleted, _ = Session.objects.filter(pk__in=keys).delete()
+        result["deleted"] += deleted
+        result["batches"] += 1
+        if sleep:
+            time.sleep(sleep)
+    return result
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = "modules.utils.sessions"
+
+    def load(self):
+        if not session_writer.shared_cache:
+            return DBStore.load(self)
+        return super().load()
+
+    def exists(self, session_key):
+        if not session_writer.shared_cache:
+            return DBStore.exists(self, session_key)
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        if not session_writer.shared_cache:
+            return DBStore.save(self, must_create)
+        if not session_writer.write_behind:
+            return super().save(must_create)
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        if must_create:
+            # The cache, not the primary key, now guards against collisions.
+            if not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+        session_writer.queue(
+            self.session_key, self.encode(data), self.get_expiry_date()
+        )
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is not None:
+            if session_writer.write_behind:
+                session_writer.mark_deleted(session_key)
+            session_writer.discard(session_key)
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        prune_expired_sessions()
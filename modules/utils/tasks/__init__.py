@@ -0,0 +1,3 @@
+from modules.utils.tasks.registry import registry, task
+
+__all__ = ["registry", "task"]
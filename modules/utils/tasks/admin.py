@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from modules.utils.tasks.models import Task, TaskStatus
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "max_attempts", "run_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_at", "locked_by", "last_error", "created_at")
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected tasks now")
+    def retry(self, request, queryset):
+        queryset.filter(status=TaskStatus.FAILED).update(
+            status=TaskStatus.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+        )
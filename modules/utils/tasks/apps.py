@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+from django.utils.translation import gettext_lazy as _
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    verbose_name = _("Tasks")
+    name = "modules.utils.tasks"
+    label = "tasks"
+
+    def ready(self):
+        # Register the @task functions of every app's tasks.py.
+        autodiscover_modules("tasks")
@@ -0,0 +1,48 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from modules.utils.tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks. SIGINT or SIGTERM stops claiming new "
+        "tasks and exits once the running ones have finished."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Tasks run at the same time (TASKS['CONCURRENCY']).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="Seconds between polls of an empty queue (TASKS['POLL_INTERVAL']).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+
+        self.stdout.write(
+            f"Worker {worker.name} running {worker.concurrency} tasks at a time."
+        )
+        stats = worker.run(burst=options["burst"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stopped: {stats['succeeded']} succeeded, "
+                f"{stats['retried']} retried, {stats['failed']} failed."
+            )
+        )
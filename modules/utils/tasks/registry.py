@@ -0,0 +1,123 @@
+from functools import update_wrapper
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class TaskFunction:
+    """
+    A function that can run inline, when called, or in a worker, when
+    enqueued.
+    """
+
+    def __init__(self, func, name, max_attempts=None, atomic=True):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.atomic = atomic
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        """
+        Queue a call for a worker.
+
+        The row is written in the caller's transaction, so the task only
+        becomes visible to workers once that transaction commits and is
+        dropped if it rolls back. Arguments must be JSON serializable.
+
+        Returns:
+            Task: The queued task.
+        """
+        from modules.utils.tasks.models import Task
+
+        max_attempts = self.max_attempts
+        if max_attempts is None:
+            max_attempts = getattr(settings, "TASKS", {}).get("MAX_ATTEMPTS", 5)
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=max_attempts,
+        )
+
+    def enqueue_once(self, *args, **kwargs):
+        """
+        Queue a call unless the same call is already queued and due, for
+        tasks whose one run covers any number of requests for it.
+
+        Only tasks no worker has claimed yet count: a running one may be
+        past the point where it would see the caller's data. Concurrent
+        callers can still both queue a call.
+
+        Returns:
+            Task: The queued task, or None if one was already waiting.
+        """
+        from modules.utils.tasks.models import Task, TaskStatus
+
+        waiting = Task.objects.filter(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            status=TaskStatus.QUEUED,
+            run_at__lte=timezone.now(),
+        )
+        if waiting.exists():
+            return None
+        return self.enqueue(*args, **kwargs)
+
+
+class TaskRegistry:
+    """
+    Task functions by name, as stored in ``Task.name``.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def register(self, task_function):
+        existing = self._tasks.get(task_function.name)
+        if existing is not None and existing.func is not task_function.func:
+            raise ValueError(f"Task {task_function.name!r} is already registered")
+        self._tasks[task_function.name] = task_function
+        return task_function
+
+    def get(self, name):
+        return self._tasks.get(name)
+
+    def __contains__(self, name):
+        return name in self._tasks
+
+
+registry = TaskRegistry()
+
+
+def task(func=None, *, name=None, max_attempts=None, atomic=True):
+    """
+    Register ``func`` as a task, usable bare or with options.
+
+    Args:
+        name (str, optional): Registry name, defaults to the dotted path.
+        max_attempts (int, optional): Runs before the task is marked failed,
+        defaults to ``TASKS['MAX_ATTEMPTS']``.
+        atomic (bool): Run in a transaction that a failure rolls back. Tasks
+        that record their own progress, and must keep it when they raise,
+        commit it themselves instead.
+
+    Returns:
+        TaskFunction: Wraps ``func`` and adds ``enqueue``.
+    """
+
+    def decorator(func):
+        return registry.register(
+            TaskFunction(
+                func,
+                name or f"{func.__module__}.{func.__qualname__}",
+                max_attempts=max_attempts,
+                atomic=atomic,
+            )
+        )
+
+    return decorator if func is None else decorator(func)
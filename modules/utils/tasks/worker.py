@@ -0,0 +1,186 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from modules.utils.tasks.models import Task, TaskStatus
+from modules.utils.tasks.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Runs queued tasks in a thread pool of ``concurrency`` threads.
+
+    Tasks are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+    number of workers can share the table without handing out a task
+    twice. A finished task is deleted. A failed one is retried after an
+    exponential backoff until it has used ``max_attempts`` runs, then kept
+    as ``failed`` with its traceback. Tasks of a worker that died are
+    claimed again once their lock is ``LOCK_TIMEOUT`` seconds old.
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None):
+        config = getattr(settings, "TASKS", {})
+        self.concurrency = concurrency or config.get("CONCURRENCY", 4)
+        self.poll_interval = poll_interval or config.get("POLL_INTERVAL", 1.0)
+        self.lock_timeout = config.get("LOCK_TIMEOUT", 600)
+        self.retry_backoff = config.get("RETRY_BACKOFF", 10)
+        self.max_backoff = config.get("MAX_BACKOFF", 3600)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"succeeded": 0, "retried": 0, "failed": 0}
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def claim(self, limit):
+        """
+        Lock up to ``limit`` due tasks for this worker.
+
+        Returns:
+            list: The claimed ``Task`` objects.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=TaskStatus.QUEUED, run_at__lte=now)
+                    | Q(
+                        status=TaskStatus.RUNNING,
+                        locked_at__lt=now - timedelta(seconds=self.lock_timeout),
+                    )
+                )
+                .order_by("run_at", "pk")[:limit]
+            )
+            if tasks:
+                Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                    status=TaskStatus.RUNNING,
+                    locked_at=now,
+                    locked_by=self.name,
+                    attempts=F("attempts") + 1,
+                )
+        for task in tasks:
+            task.status = TaskStatus.RUNNING
+            task.locked_at = now
+            task.locked_by = self.name
+            task.attempts += 1
+        return tasks
+
+    def execute(self, task):
+        """
+        Run a claimed task and record the outcome. Atomic tasks run in a
+        transaction, so a failed run leaves no partial writes behind for its
+        retry.
+        """
+        try:
+            func = registry.get(task.name)
+            if func is None:
+                raise LookupError(f"Unknown task {task.name!r}")
+            if task.attempts > task.max_attempts:
+                raise RuntimeError("The worker running this task stopped")
+            with transaction.atomic() if func.atomic else nullcontext():
+                func(*task.args, **task.kwargs)
+        except Exception:
+            self._record_failure(task, traceback.format_exc())
+        else:
+            Task.objects.filter(pk=task.pk).delete()
+            self._count("succeeded")
+
+    def run(self, burst=False):
+        """
+        Claim and run tasks until ``stop`` is called, or until the queue is
+        empty with ``burst``. Running tasks are finished before returning.
+
+        Returns:
+            dict: Succeeded, retried and failed counts.
+        """
+        in_flight = set()
+        with ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix="task-worker"
+        ) as pool:
+            while not self._stopping.is_set():
+                free = self.concurrency - len(in_flight)
+                claimed = None
+                try:
+                    claimed = self.claim(free) if free else []
+                except DatabaseError:
+                    # E.g. the database restarting; try again next poll.
+                    logger.exception("Could not claim tasks")
+                    close_old_connections()
+                for task in claimed or ():
+                    in_flight.add(pool.submit(self._execute_in_thread, task))
+
+                if in_flight:
+                    _, in_flight = wait(
+                        in_flight,
+                        timeout=self.poll_interval,
+                        return_when=FIRST_COMPLETED,
+                    )
+                elif burst and claimed is not None:
+                    break
+                else:
+                    self._stopping.wait(self.poll_interval)
+        return dict(self.stats)
+
+    def drain(self):
+        """
+        Run every due task in the calling thread, one at a time.
+
+        Returns:
+            dict: Succeeded, retried and failed counts.
+        """
+        while tasks := self.claim(self.concurrency):
+            for task in tasks:
+                self.execute(task)
+        return dict(self.stats)
+
+    def stop(self):
+        self._stopping.set()
+
+    def backoff(self, attempts):
+        """
+        Returns:
+            float: Seconds to wait before the next run after ``attempts``
+            runs.
+        """
+        return min(self.retry_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def _execute_in_thread(self, task):
+        # Pool threads keep their connections between tasks, like a
+        # request handler between requests.
+        close_old_connections()
+        try:
+            self.execute(task)
+        finally:
+            close_old_connections()
+
+    def _record_failure(self, task, error):
+        retry = task.attempts < task.max_attempts
+        if retry:
+            logger.warning("Task %s failed, retrying:\n%s", task, error)
+            changes = {
+                "status": TaskStatus.QUEUED,
+                "run_at": timezone.now()
+                + timedelta(seconds=self.backoff(task.attempts)),
+            }
+        else:
+            logger.error("Task %s failed permanently:\n%s", task, error)
+            changes = {"status": TaskStatus.FAILED}
+        Task.objects.filter(pk=task.pk).update(
+            locked_at=None, locked_by="", last_error=error, **changes
+        )
+        self._count("retried" if retry else "failed")
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1